@@ -0,0 +1,45 @@
+"""Throughput of concurrent template generations against the stub model backend.
+
+    python -m benchmarks.template_generation [requests] [latency_seconds]
+
+Needs no network or API key: the model answers locally after the given latency.
+"""
+import os
+import sys
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("MODEL_BACKEND", "stub")
+os.environ.setdefault("LLM_CACHE_TTL_SECONDS", "0")
+
+from src.components import model
+from src.components.model import OpenAIModel, model_client
+
+def prompt(index: int) -> list:
+    return [{"role": "user", "content": f"Generate templates for campaign {index}"}]
+
+def timed(label: str, requests: int, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {elapsed:8.3f}s  {requests / elapsed:8.1f} req/s")
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    model.STUB_LATENCY_SECONDS = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    print(f"{requests} generations, {model.STUB_LATENCY_SECONDS}s model latency, "
+          f"{model.OPENAI_MAX_CONCURRENCY} in flight")
+
+    # Sync callers, e.g. Flask worker threads, each waiting on the shared loop
+    with ThreadPoolExecutor(max_workers=32) as threads:
+        timed("32 threads via OpenAIModel.run", requests,
+              lambda: list(threads.map(lambda index: OpenAIModel().run(prompt(index), use_cache=False), range(requests))))
+
+    # Async callers on the loop itself need no thread per request
+    async def gather():
+        await asyncio.gather(*(OpenAIModel().arun(prompt(index), use_cache=False) for index in range(requests)))
+    timed("asyncio.gather via OpenAIModel.arun", requests, lambda: model_client.run(gather()))
+
+if __name__ == "__main__":
+    main()
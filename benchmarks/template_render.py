@@ -0,0 +1,45 @@
+"""Per-contact cost of rendering a campaign template over a large batch.
+
+    python -m benchmarks.template_render [rows]
+"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+from src.template_engine.compiled_template import CompiledTemplate
+
+TEMPLATE = (
+    'f"Hello {first_name}, this is a reminder that your payment of {amount_due} '
+    'for policy {policy_number} is due on {due_date}. Reply to {phone_number} with any questions."'
+)
+
+def make_contacts(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    return pd.DataFrame({
+        "first_name": rng.choice(["Asha", "Ravi", "Maria", "John", "Wei"], rows),
+        "amount_due": rng.integers(100, 10000, rows).astype(float) / 10,
+        "policy_number": rng.integers(10**7, 10**8, rows),
+        "due_date": pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D"),
+        "phone_number": ["+1555" + str(n) for n in rng.integers(10**6, 10**7, rows)],
+    })
+
+def timed(label: str, rows: int, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:8.3f}s  {elapsed / rows * 1e6:8.2f} us/row")
+    return result
+
+def main(rows: int = 100_000):
+    contacts = make_contacts(rows)
+    template = CompiledTemplate(TEMPLATE)
+    print(f"{rows} contacts")
+    # Previous path: one dict and one str.format call per contact
+    looped = timed("per-row str.format", rows, lambda: [
+        template.render(contact) for contact in contacts.to_dict(orient="records")
+    ])
+    vectorized = timed("CompiledTemplate.render_frame", rows, lambda: template.render_frame(contacts))
+    assert looped == vectorized.tolist()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -1,45 +1,146 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.executors.pool import ThreadPoolExecutor
 from src.database.mongodb import db
-from datetime import datetime
-import requests
-import sqlite3  # or use your actual DB module
+from src.dialer.launcher import launch_call_batch
+from src.dialer.redial import find_due_redial_batches
+from src.dialer.columnar_batch import COLUMNAR
+from itertools import chain
+from datetime import datetime, timedelta
+import os
 import time
 
 # Configuration
-API_ENDPOINT = "http://127.0.0.1:8000/launch/execute_call_batch"
+# Threads that start due batches; dispatch itself runs on the shared background loop
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", 10))
+# Hand batches to dispatch workers (worker.py) instead of dialing in this process
+SCHEDULER_DISTRIBUTED = os.getenv("SCHEDULER_DISTRIBUTED", "false").lower() == "true"
+# Seconds between releases of due contacts for batches with a calling window
+SCHEDULER_SLICE_SECONDS = int(os.getenv("SCHEDULER_SLICE_SECONDS", 60))
+# Seconds between sweeps for contacts due for a redial
+REDIAL_POLL_SECONDS = int(os.getenv("REDIAL_POLL_SECONDS", 60))
+# Seconds between polls for newly created batches
+SCHEDULER_POLL_SECONDS = int(os.getenv("SCHEDULER_POLL_SECONDS", 30))
+# Re-scan this far behind the watermark so batches still being inserted are not missed
+WATERMARK_OVERLAP = timedelta(seconds=120)
 
-# Function to trigger API
-def trigger_api(batch_name, user_id):
-    print(f"Triggering API for {batch_name} at {datetime.now()}")
-    response = requests.post(API_ENDPOINT, json={"batch_name": batch_name, "user_id": user_id})
-    print(f"Status: {response.status_code}, Response: {response.text}")
+# Function to launch a batch in-process
+def launch_scheduled_batch(batch_name, user_id):
+    print(f"Launching {batch_name} at {datetime.now()}")
+    try:
+        # The dispatch runs on the shared background loop, so the job thread is free again at once;
+        # waiting here would hold a pool thread for the whole batch and starve every other job
+        body, status_code = launch_call_batch(
+            user_id, batch_name, wait=False, distributed=SCHEDULER_DISTRIBUTED
+        )
+        print(f"Status: {status_code}, Response: {body}")
+        if body.get("retry"):
+            # The batch is still being stored; try again once creation has had time to finish
+            scheduler.add_job(launch_scheduled_batch, 'date', run_date=datetime.now() + timedelta(seconds=SCHEDULER_POLL_SECONDS),
+                              args=[batch_name, user_id], id=f"retry:{user_id}:{batch_name}", replace_existing=True)
+    except Exception as e:
+        print(f"Failed to launch {batch_name}: {str(e)}")
+
+# Relaunch batches whose redial backoff has elapsed
+def launch_due_redials():
+    for user_id, batch_name in find_due_redial_batches():
+        scheduler.add_job(launch_scheduled_batch, args=[batch_name, user_id], id=f"redial:{user_id}:{batch_name}",
+                          replace_existing=True)
+
+# Jobs persisted in jobs.sqlite before the in-process launch still reference trigger_api
+trigger_api = launch_scheduled_batch
 
 # Load jobs from database
-def load_scheduled_jobs(scheduler):
-    batch_details = list(db.call_batch_details.find())
+def find_scheduled_batches(since=None):
+    """Distinct future batches, optionally only those created after `since`."""
+    now = datetime.now()
+    # Windowed batches stay active until their last contact is released
+    match = {"$or": [{"scheduledTime": {"$gte": now}}, {"release_at": {"$gte": now}}]}
+    if since is not None:
+        match["created_at"] = {"$gt": since}
+    return db.call_batch_details.aggregate([
+        {"$match": match},
+        {"$project": {"_id": 0, "created_by": 1, "batch_name": 1, "scheduledTime": 1, "created_at": 1, "release_at": 1}},
+        {"$group": {
+            "_id": {"created_by": "$created_by", "batch_name": "$batch_name"},
+            "scheduledTime": {"$min": "$scheduledTime"},
+            "created_at": {"$max": "$created_at"},
+            "first_release": {"$min": "$release_at"},
+            "last_release": {"$max": "$release_at"},
+        }},
+    ])
+
+def find_scheduled_columnar_batches(since=None):
+    """Same shape as find_scheduled_batches for batches stored as Parquet, read from their header."""
+    now = datetime.now()
+    match = {"storage.format": COLUMNAR, "$or": [{"storage.scheduledTime": {"$gte": now}}, {"storage.last_release": {"$gte": now}}]}
+    if since is not None:
+        match["storage.created_at"] = {"$gt": since}
+    for run in db.call_batch_runs.find(match, {"created_by": 1, "batch_name": 1, "storage": 1}):
+        storage = run["storage"]
+        yield {
+            "_id": {"created_by": run["created_by"], "batch_name": run["batch_name"]},
+            "scheduledTime": storage.get("scheduledTime"),
+            "created_at": storage.get("created_at"),
+            "first_release": storage.get("first_release"),
+            "last_release": storage.get("last_release"),
+        }
 
-    for batch_detail in batch_details:
-        kick_time = batch_detail['scheduledTime']
-        if kick_time >= datetime.now():
-            batch_name = batch_detail['batch_name']
-            user_id = batch_detail['created_by']
-            scheduler.add_job(trigger_api, 'date', run_date=kick_time, args=[batch_name, user_id], id=batch_name)
+def load_scheduled_jobs(scheduler, since=None):
+    """Add a job per new batch and return the created_at watermark for the next poll."""
+    watermark = since
+    for batch in chain(find_scheduled_batches(since), find_scheduled_columnar_batches(since)):
+        batch_name = batch['_id']['batch_name']
+        user_id = batch['_id']['created_by']
+        if batch.get('last_release'):
+            # Release the contacts that have come due, one time slice at a time
+            scheduler.add_job(
+                launch_scheduled_batch, 'interval', seconds=SCHEDULER_SLICE_SECONDS, args=[batch_name, user_id],
+                start_date=max(batch['first_release'], datetime.now()),
+                end_date=batch['last_release'] + timedelta(seconds=SCHEDULER_SLICE_SECONDS),
+                id=f"{user_id}:{batch_name}", replace_existing=True,
+            )
+        else:
+            scheduler.add_job(
+                launch_scheduled_batch, 'date', run_date=batch['scheduledTime'], args=[batch_name, user_id],
+                id=f"{user_id}:{batch_name}", replace_existing=True,
+            )
+        if batch.get('created_at') and (watermark is None or batch['created_at'] > watermark):
+            watermark = batch['created_at']
+    return watermark
 
 
 # Setup scheduler
 jobstores = {
     'default': SQLAlchemyJobStore(url='sqlite:///jobs.sqlite')  # Persists scheduled jobs
 }
-scheduler = BackgroundScheduler(jobstores=jobstores)
+executors = {
+    'default': ThreadPoolExecutor(SCHEDULER_WORKERS)
+}
+job_defaults = {
+    # A job that waited for a free thread still runs, and a backlog of runs collapses into one
+    'misfire_grace_time': None,
+    'coalesce': True,
+}
+scheduler = BackgroundScheduler(jobstores=jobstores, executors=executors, job_defaults=job_defaults)
 scheduler.start()
 
+# Only future contacts are read, through the scheduledTime and release_at indexes
+db.call_batch_details.create_index([("scheduledTime", 1), ("created_at", 1)])
+db.call_batch_details.create_index([("release_at", 1), ("created_at", 1)])
+db.call_batch_runs.create_index([("storage.format", 1), ("storage.created_at", 1)], sparse=True)
+
 # Load jobs from DB
-load_scheduled_jobs(scheduler)
+watermark = load_scheduled_jobs(scheduler)
+scheduler.add_job(launch_due_redials, 'interval', seconds=REDIAL_POLL_SECONDS, id="redial-sweep", replace_existing=True)
 
-# Keep script running
+# Keep script running and pick up new batches incrementally
 try:
     while True:
-        time.sleep(5)
+        time.sleep(SCHEDULER_POLL_SECONDS)
+        since = watermark - WATERMARK_OVERLAP if watermark else None
+        latest = load_scheduled_jobs(scheduler, since)
+        if latest and (watermark is None or latest > watermark):
+            watermark = latest
 except (KeyboardInterrupt, SystemExit):
     scheduler.shutdown()
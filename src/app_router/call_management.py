@@ -1,16 +1,60 @@
+import pandas as pd
 from datetime import datetime, timedelta
 from flask import Blueprint, jsonify, request
-from src.database.mongodb import db
-from src.user_utils.utils import validate_template
-from src.user_utils.params import CallBatch, CampaignTemplates
+from src.database.mongodb import db, get_dataframe
+from src.database.bulk_writer import BulkWriter
+from src.user_utils.utils import validate_template, to_snake_case
+from src.user_utils.phone_numbers import clean_contacts, find_phone_column
+from src.user_utils.params import CallBatch, CampaignTemplates, DoNotCall
 from src.user_utils.auth import login_required, admin_required, get_token_data
 
 from src.logger.log import Log_class
+from src.dialer.batch_state import PENDING, record_creation_progress
+from src.dialer.calling_window import assign_release_times
+from src.dialer.redial import build_redial_policy, save_redial_policy, save_calling_window
+from src.dialer.suppression import suppression_index, add_do_not_call, remove_do_not_call
+from src.dialer.columnar_batch import COLUMNAR, STORAGE_FORMATS, DEFAULT_STORAGE_FORMAT, store_columnar_batch, delete_columnar_batch
 from src.template_engine.campaign_template_generator import CampaignTemplateGenerator
+from src.template_engine.compiled_template import records_frame, template_cache_info
+from src.components.response_cache import response_cache
 
 call_bp = Blueprint('call_bp', __name__)
 logg_obj = Log_class("logs", "call_bp.txt")
 
+#get the contacts of a file stored through /files/store_contact_data, as (df, None) or (None, error response)
+def load_contact_frame(file_id, user_id):
+    file_info = db.get_file_info(file_id)
+    if not file_info or (file_info.get("metadata") or {}).get("uploaded_by") != user_id:
+        return None, (jsonify({'status': False, "error": "Contact file not found for this user"}), 404)
+    df = get_dataframe(file_id)
+    if df is None:
+        return None, (jsonify({'status': False, "error": "Failed to read the contact file"}), 400)
+    df.columns = [to_snake_case(col) for col in df.columns]
+    return df, None
+
+#store one document per contact, rendering chunk by chunk while earlier chunks are written in the background
+def store_document_batch(contacts_df, campaign_obj, campaign_template, shared, release_times=None, on_progress=None):
+    with BulkWriter(db.call_batch_details, on_progress=on_progress) as writer:
+        for start in range(0, len(contacts_df), writer.chunk_size):
+            if writer.errors:
+                break
+            chunk = contacts_df.iloc[start:start + writer.chunk_size]
+            templates = campaign_obj.evaluate_frame_templates(campaign_template, chunk)
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            for field, value in shared.items():
+                chunk[field] = value
+            chunk["template"] = templates
+            if release_times is not None:
+                chunk["release_at"] = pd.Series(release_times[start:start + writer.chunk_size], index=chunk.index, dtype=object)
+            writer.extend(chunk.to_dict(orient='records'))
+    return writer
+
+#drop whatever part of a batch was stored so the same name can be submitted again
+def discard_call_batch(user_id, batch_name, total):
+    db.call_batch_details.delete_many({"created_by": user_id, "batch_name": batch_name})
+    delete_columnar_batch(user_id, batch_name)
+    record_creation_progress(user_id, batch_name, 0, total, state="failed")
+
 #------------------------------------------#
 #-------------Campaign-Management----------#
 #------------------------------------------#
@@ -27,10 +71,18 @@ def generate_campaign_templates_api():
         token_data = get_token_data()
         if token_data:
             camapign_data = dict(db.campaign_details.find_one({"campaign_id":campaign_id},{"_id":0}) )
-            campaign_columns = list(callDetails[0].keys())
+            if templates_data.get("file_id"):
+                contacts_df, error = load_contact_frame(templates_data["file_id"], token_data["user_id"])
+                if error:
+                    return error
+                campaign_columns = list(contacts_df.columns)
+            elif callDetails:
+                campaign_columns = list(callDetails[0].keys())
+            else:
+                return jsonify({'status': False, "error": "Provide either callDetails or file_id."}), 400
             #---------------------------------------#
             campaign_obj = CampaignTemplateGenerator()
-            campaign_templates = campaign_obj.generate_templates(campaign_columns, camapign_data)
+            campaign_templates = campaign_obj.generate_templates(campaign_columns, camapign_data, refresh=templates_data.get("refresh"))
             return list(campaign_templates.values())
         else:
            return jsonify({'status':False, "error": "Authorization failed. Please provide a valid JWT token."}), 400
@@ -38,6 +90,26 @@ def generate_campaign_templates_api():
         error = str(e).replace("\n"," * ")
         return jsonify({'status':False, "error": f"{error}"}), 500
 
+@call_bp.route('/template_cache_stats', methods=['GET'])
+@login_required
+@admin_required
+def template_cache_stats_api():
+    """Hit rate and tokens saved by the model response cache."""
+    try:
+        return jsonify({"status": True, "data": response_cache.stats()})
+    except Exception as e:
+        return jsonify({'status': False, "error": f"template_cache_stats: {str(e)}"}), 500
+
+@call_bp.route('/compiled_template_stats', methods=['GET'])
+@login_required
+@admin_required
+def compiled_template_stats_api():
+    """Hits and size of the per-process cache of compiled contact templates."""
+    try:
+        return jsonify({"status": True, "data": template_cache_info()})
+    except Exception as e:
+        return jsonify({'status': False, "error": f"compiled_template_stats: {str(e)}"}), 500
+
 @call_bp.route('/make_call_batch', methods=['POST'])
 @login_required
 @admin_required
@@ -54,7 +126,20 @@ def make_call_batch_api():
         # Get user ID from token
         token_data = get_token_data()
         if token_data:
-           campaign_columns = list(callDetails[0].keys())
+           # Contacts come from a stored file so large batches never round-trip through the browser
+           if callData.get("file_id"):
+               contacts_df, error = load_contact_frame(callData["file_id"], token_data["user_id"])
+               if error:
+                   return error
+               contact_report = contacts_df.attrs.get("contact_report")
+           elif callDetails:
+               # Phone numbers are normalized to E.164 and each number is dialed once per batch
+               contacts_df, contact_report = clean_contacts(records_frame(callDetails))
+           else:
+               return jsonify({'status': False, "error": "Provide either callDetails or file_id."}), 400
+           if contacts_df.empty:
+               return jsonify({'status': False, "error": "No contacts with a valid phone number.", "report": contact_report}), 400
+           campaign_columns = list(contacts_df.columns)
            error = validate_template(campaign_template, campaign_columns)
            #------------------------------------------------------------#
            if error:
@@ -63,19 +148,108 @@ def make_call_batch_api():
                 exist = db.call_batch_details.find_one({"created_by":token_data["user_id"], "batch_name":batch_name})
                 if exist:
                    return jsonify({'status': False, "error": "Batch already exists in the database. Please use a different batch name."}), 400
-                query = []
-                for contact in callDetails:
-                    contact["campaign_id"] = campaign_id
-                    contact["batch_name"] = batch_name
-                    contact["template"] = campaign_obj.evaluate_fstring_templates(campaign_template, contact)
-                    contact["scheduledTime"] = scheduledTime
-                    contact["created_at"] = datetime.utcnow()
-                    contact["created_by"] = token_data["user_id"]
-                    query.append(contact)
-                result = db.call_batch_details.insert_many(query)
-                return jsonify({'status': True, "message": f"Call batch successfully created. Total number of contacts: {len(result.inserted_ids)}."})
+                storage_format = callData.get("storageFormat") or DEFAULT_STORAGE_FORMAT
+                if storage_format not in STORAGE_FORMATS:
+                    return jsonify({'status': False, "error": f"storageFormat must be one of {', '.join(STORAGE_FORMATS)}"}), 400
+                # Drop do-not-call numbers now; recent-contact suppression depends on when a contact
+                # is dialed, so the engine's screen() applies it at dispatch time
+                phone_column = find_phone_column(contacts_df.columns)
+                contacts_df, suppressed = suppression_index.filter_frame(
+                    token_data["user_id"], contacts_df, phone_column, batch_name, recent=False
+                )
+                if contact_report is not None:
+                    contact_report["suppressed"] = suppressed
+                if contacts_df.empty:
+                    return jsonify({'status': False, "error": "Every contact in the batch is suppressed.", "report": contact_report}), 400
+                # Spread the batch across its calling window instead of one spike at scheduledTime
+                release_times = None
+                if callData.get("callingWindowStart") or callData.get("callingWindowEnd"):
+                    if not (callData.get("callingWindowStart") and callData.get("callingWindowEnd")):
+                        return jsonify({'status': False, "error": "Both callingWindowStart and callingWindowEnd are required."}), 400
+                    release_times = assign_release_times(
+                        contacts_df,
+                        scheduledTime,
+                        callData["callingWindowStart"],
+                        callData["callingWindowEnd"],
+                        default_timezone=callData.get("timezone"),
+                        timezone_column=callData.get("timezoneColumn"),
+                        calls_per_minute=callData.get("callsPerMinute"),
+                    ).dt.to_pydatetime()
+                total = len(contacts_df)
+                progress = lambda inserted: record_creation_progress(token_data["user_id"], batch_name, inserted, total)
+                created_at = datetime.utcnow()
+                try:
+                    if storage_format == COLUMNAR:
+                        # Contact columns and templates go to one Parquet file; Mongo keeps only dispatch state
+                        templates = campaign_obj.evaluate_frame_templates(campaign_template, contacts_df)
+                        header = {"campaign_id": campaign_id, "scheduledTime": scheduledTime, "created_at": created_at}
+                        writer = store_columnar_batch(
+                            token_data["user_id"], batch_name, contacts_df, templates, header,
+                            phone_column=phone_column, release_times=release_times, on_progress=progress,
+                        )
+                    else:
+                        shared = {
+                            "campaign_id": campaign_id, "batch_name": batch_name, "scheduledTime": scheduledTime,
+                            "created_at": created_at, "created_by": token_data["user_id"], "dispatch_status": PENDING,
+                        }
+                        writer = store_document_batch(
+                            contacts_df, campaign_obj, campaign_template, shared, release_times=release_times, on_progress=progress
+                        )
+                except Exception as e:
+                    # A render failure part way through must not leave a half-stored batch behind
+                    discard_call_batch(token_data["user_id"], batch_name, total)
+                    logg_obj.Error_Log(f"Creating batch {batch_name} failed: {str(e)}")
+                    raise
+                if writer.errors:
+                    discard_call_batch(token_data["user_id"], batch_name, total)
+                    return jsonify({'status': False, "error": f"Failed to store the call batch: {writer.errors[0]}"}), 500
+                record_creation_progress(token_data["user_id"], batch_name, writer.inserted, total, state="created")
+                save_redial_policy(token_data["user_id"], batch_name, build_redial_policy(
+                    callData.get("maxAttempts"), callData.get("redialBackoffMinutes"), callData.get("redialBackoffMultiplier")
+                ))
+                if release_times is not None:
+                    save_calling_window(
+                        token_data["user_id"], batch_name, callData["callingWindowStart"], callData["callingWindowEnd"],
+                        timezone=callData.get("timezone"), timezone_column=callData.get("timezoneColumn"),
+                    )
+                return jsonify({'status': True, "message": f"Call batch successfully created. Total number of contacts: {writer.inserted}.", "report": contact_report})
         else:
            return jsonify({'status':False, "error": "Authorization failed. Please provide a valid JWT token."}), 400
     except Exception as e:
         error = str(e).replace("\n"," * ")
-        return jsonify({'status':False, "error": f"{error}"}), 500
\ No newline at end of file
+        return jsonify({'status':False, "error": f"{error}"}), 500
+
+#------------------------------------------#
+#---------------Do-Not-Call----------------#
+#------------------------------------------#
+@call_bp.route('/do_not_call', methods=['POST'])
+@login_required
+@admin_required
+def add_do_not_call_api():
+    try:
+        dnc_data = DoNotCall.parse_raw(request.data).dict()
+        token_data = get_token_data()
+        if token_data:
+            result = add_do_not_call(token_data["user_id"], dnc_data["phone_numbers"], dnc_data.get("reason"))
+            return jsonify({'status': True, "message": f"{len(result['added'])} numbers added to the do-not-call list.", "data": result})
+        else:
+           return jsonify({'status':False, "error": "Authorization failed. Please provide a valid JWT token."}), 400
+    except Exception as e:
+        error = str(e).replace("\n"," * ")
+        return jsonify({'status':False, "error": f"{error}"}), 500
+
+@call_bp.route('/remove_do_not_call', methods=['POST'])
+@login_required
+@admin_required
+def remove_do_not_call_api():
+    try:
+        dnc_data = DoNotCall.parse_raw(request.data).dict()
+        token_data = get_token_data()
+        if token_data:
+            removed = remove_do_not_call(token_data["user_id"], dnc_data["phone_numbers"])
+            return jsonify({'status': True, "message": f"{removed} numbers removed from the do-not-call list."})
+        else:
+           return jsonify({'status':False, "error": "Authorization failed. Please provide a valid JWT token."}), 400
+    except Exception as e:
+        error = str(e).replace("\n"," * ")
+        return jsonify({'status':False, "error": f"{error}"}), 500
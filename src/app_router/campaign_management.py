@@ -3,6 +3,7 @@ from flask import Blueprint, jsonify, request
 
 from src.logger.log import Log_class
 from src.database.mongodb import db
+from src.database.knowledge_base_store import find_knowledge_base
 from src.user_utils.params import CreateCampaign
 from src.user_utils.auth import login_required, admin_required, get_token_data
 
@@ -31,6 +32,9 @@ def create_campaign_api():
             campaign_data["totalCallTime"] = 0
             campaign_data["user_id"] = user_id
             campaign_data["created_at"] = current_timestamp()
+            #A knowledge base referenced by hash must have been uploaded by this user.
+            if campaign_data.get("knowledge_base_id") and not find_knowledge_base(campaign_data["knowledge_base_id"], user_id):
+                return jsonify({'status':False,'error': 'knowledge base not found, upload the file again'}), 400
             #Check the campaign is already exists.
             if db.campaign_details.find_one({"user_id":user_id,"campaign_name":campaign_data["campaign_name"]},{"_id":0}):
                 return jsonify({'status':False,'error': 'campaign already exists!'}), 400
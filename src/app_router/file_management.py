@@ -1,10 +1,20 @@
+import io
 import os
+import json
+from datetime import datetime
 import pandas as pd
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 
 from src.logger.log import Log_class
-from src.user_utils.auth import login_required, admin_required
-from src.user_utils.utils import extract_text_from_txt, extract_text_from_pdf, extract_text_from_docx, to_snake_case
+from src.database.mongodb import db
+from src.database.frame_cache import frame_cache
+from src.database.knowledge_base_store import content_hash, get_knowledge_base_text, store_knowledge_base, touch_knowledge_base
+from src.user_utils.auth import login_required, admin_required, get_token_data
+from src.user_utils.utils import to_snake_case
+from src.user_utils.kb_extractor import KB_EXTENSIONS, iter_document_text, extract_document_text
+from src.user_utils.phone_numbers import clean_contacts, clean_contact_chunks
+from src.user_utils.excel_reader import read_excel_frame, ALL_SHEETS
+from src.user_utils.contact_reader import CONTACT_CHUNK_SIZE, CONTACT_EXTENSIONS, iter_contact_chunks, iter_ndjson, read_contact_page
 
 file_bp = Blueprint('file_bp', __name__)
 logg_obj = Log_class("logs", "file_bp.txt")
@@ -24,26 +34,50 @@ def upload_knowledge_base_api():
         if file.filename == '':
             return jsonify({"error": "No selected file"}), 400
 
-        text = ""
         filename = file.filename
         ext = filename.rsplit('.', 1)[-1].lower()
-
-        try:
-            if ext == 'txt':
-                text = extract_text_from_txt(file.stream)
-            elif ext == 'pdf':
-                text = extract_text_from_pdf(file.stream)
-            elif ext == 'docx':
-                text = extract_text_from_docx(file.stream)
-            else:
-                return jsonify({"error": "Unsupported file format"}), 400
-            text = text.replace("\n"," ").replace("  "," ")
-        except Exception as e:
-            return jsonify({"error": f"Failed to extract text: {str(e)}"}), 500
-
+        if ext not in KB_EXTENSIONS:
+            return jsonify({"error": "Unsupported file format"}), 400
+        data = file.read()
+        user_id = get_token_data().get("user_id")
+
+        # Text is stored under the hash of the uploaded bytes, so a re-upload skips extraction
+        kb_hash = content_hash(data)
+        text = get_knowledge_base_text(kb_hash)
+        cache_hit = text is not None
+        if cache_hit:
+            touch_knowledge_base(kb_hash, user_id)
+
+        # ?stream=true sends the text piece by piece (one page range per line) as it is extracted
+        if request.args.get('stream', '').lower() == 'true':
+            def generate():
+                try:
+                    if cache_hit:
+                        yield json.dumps({"first_page": None, "last_page": None, "text": text}) + "\n"
+                    else:
+                        pieces = []
+                        for first_page, last_page, piece in iter_document_text(data, ext):
+                            pieces.append(piece)
+                            yield json.dumps({"first_page": first_page, "last_page": last_page, "text": piece}) + "\n"
+                        store_knowledge_base(kb_hash, " ".join(piece for piece in pieces if piece), filename, ext, len(data), user_id)
+                    yield json.dumps({"filename": filename, "knowledge_base_id": kb_hash, "cache_hit": cache_hit, "done": True}) + "\n"
+                except Exception as e:
+                    yield json.dumps({"error": f"Failed to extract text: {str(e)}"}) + "\n"
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+        if not cache_hit:
+            try:
+                text = extract_document_text(data, ext)
+            except Exception as e:
+                return jsonify({"error": f"Failed to extract text: {str(e)}"}), 500
+            store_knowledge_base(kb_hash, text, filename, ext, len(data), user_id)
+
+        # Campaigns can reference knowledge_base_id instead of embedding the text
         return jsonify({
             "filename": filename,
-            "extracted_text": text.strip()
+            "extracted_text": text,
+            "knowledge_base_id": kb_hash,
+            "cache_hit": cache_hit
         })
     except Exception as e:
         return jsonify({"error": f"Failed extract-text: {str(e)}"}), 500
@@ -64,20 +98,46 @@ def upload_contact_data_api():
             return jsonify({"error": "No file selected"}), 400
 
         ext = filename.rsplit('.', 1)[-1].lower()
-        if ext not in ['xlsx', 'xls', 'csv']:
+        if ext not in CONTACT_EXTENSIONS:
             return jsonify({"error": "Unsupported file format"}), 400
 
+        # ?format=ndjson streams records chunk by chunk with bounded memory
+        if request.args.get('format') == 'ndjson':
+            chunksize = request.args.get('chunk_size', CONTACT_CHUNK_SIZE, type=int)
+            # Rejected here: once the stream has started an error can only truncate the response
+            if chunksize < 1:
+                return jsonify({"error": "chunk_size must be a positive integer"}), 400
+            chunks = clean_contact_chunks(iter_contact_chunks(file.stream, ext, chunksize))
+            return Response(stream_with_context(iter_ndjson(chunks)), mimetype='application/x-ndjson')
+
+        # ?page=N&page_size=M returns a single page
+        if 'page' in request.args:
+            page = max(request.args.get('page', 0, type=int), 0)
+            page_size = max(request.args.get('page_size', 1000, type=int), 1)
+            records, has_more, report = read_contact_page(file.stream, ext, page, page_size)
+            # Rows are cleaned per page, so "report" counts only this page's drops
+            body = '{"page": %d, "page_size": %d, "has_more": %s, "report": %s, "data": %s}' % (
+                page, page_size, json.dumps(has_more), json.dumps(report), records
+            )
+            return Response(body, mimetype='application/json')
+
         try:
             # Choose how to read the file based on extension
             if ext in ['xlsx', 'xls']:
-                df = pd.read_excel(file, engine='openpyxl' if ext == 'xlsx' else 'xlrd')
+                # ?sheets=all stacks every sheet of the workbook
+                df = read_excel_frame(file.read(), ext, sheets=request.args.get('sheets'))
             elif ext == 'csv':
                 df = pd.read_csv(file)
 
             # Convert to list of row-wise JSONs
             # Rename columns
             df.columns = [to_snake_case(col) for col in df.columns]
+            # Normalize phone numbers to E.164 and drop invalid numbers and duplicates
+            df, report = clean_contacts(df)
             data_json = df.to_dict(orient='records')
+            # ?report=true also returns what was dropped
+            if request.args.get('report', '').lower() == 'true':
+                return jsonify({"data": data_json, "report": report})
             return jsonify(data_json)
 
         except Exception as e:
@@ -85,6 +145,62 @@ def upload_contact_data_api():
     except Exception as e:
         return jsonify({"error": f"upload_contact_data: {str(e)}"}), 500
 
+#-----------------------store_contact_data-------------------------#
+@file_bp.route('/store_contact_data', methods=['POST'])
+@login_required
+@admin_required
+def store_contact_data_api():
+    """Store a contact file in GridFS once; batches are then created from its file_id."""
+    try:
+        if 'file' not in request.files:
+            return jsonify({"error": "No file uploaded"}), 400
+
+        file = request.files['file']
+        filename = file.filename
+
+        if filename == '':
+            return jsonify({"error": "No file selected"}), 400
 
+        ext = filename.rsplit('.', 1)[-1].lower()
+        if ext not in CONTACT_EXTENSIONS:
+            return jsonify({"error": "Unsupported file format"}), 400
 
+        data = file.read()
+        try:
+            # Parse only a small first chunk to report the columns
+            preview = next(iter_contact_chunks(io.BytesIO(data), ext, chunksize=5), None)
+        except Exception as e:
+            return jsonify({"error": f"Failed to read file: {str(e)}"}), 500
+        if preview is None:
+            return jsonify({"error": "File has no contact rows"}), 400
+
+        token_data = get_token_data()
+        metadata = {
+            "file_type": ext,
+            "purpose": "contact_data",
+            "uploaded_by": token_data.get("user_id"),
+            "uploaded_at": datetime.utcnow(),
+        }
+        if request.args.get('sheets') == ALL_SHEETS:
+            metadata["sheets"] = ALL_SHEETS
+        file_id = db.store_file(data, filename, metadata=metadata)
+        return jsonify({
+            "status": True,
+            "file_id": file_id,
+            "filename": filename,
+            "columns": list(preview.columns),
+            "preview": json.loads(preview.to_json(orient='records', date_format='iso')),
+        })
+    except Exception as e:
+        return jsonify({"error": f"store_contact_data: {str(e)}"}), 500
 
+#-----------------------contact_cache_stats-------------------------#
+@file_bp.route('/contact_cache_stats', methods=['GET'])
+@login_required
+@admin_required
+def contact_cache_stats_api():
+    """Hit/miss counters and size of the parsed contact file cache in this process."""
+    try:
+        return jsonify({"status": True, "data": frame_cache.stats()})
+    except Exception as e:
+        return jsonify({"error": f"contact_cache_stats: {str(e)}"}), 500
@@ -36,7 +36,7 @@ def decrypt_credential(encrypted_credential):
 @admin_required
 def add_telephony():
     try:
-        telephony_data = AddTelephony.parse_raw(request.data).dict()
+        telephony_data = AddTelephony.parse_raw(request.data).dict(exclude_none=True)
         
         # Encrypt sensitive credentials
         telephony_data['twilioAccountSid'] = encrypt_credential(telephony_data.get('twilioAccountSid'))
@@ -127,7 +127,7 @@ def get_telephony():
 @admin_required
 def update_telephony():
     try:
-        telephony_data = AddTelephony.parse_raw(request.data).dict()
+        telephony_data = AddTelephony.parse_raw(request.data).dict(exclude_none=True)
         
         # Get user ID from token
         token_data = get_token_data()
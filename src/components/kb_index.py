@@ -0,0 +1,144 @@
+import os
+import re
+import hashlib
+import unicodedata
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# Knowledge bases up to this many characters go into the prompt whole.
+KB_PROMPT_CHARS = int(os.getenv("KB_PROMPT_CHARS", 6000))
+# Chunks retrieved for a prompt when the knowledge base is longer.
+KB_TOP_K = int(os.getenv("KB_TOP_K", 5))
+# Words per chunk, and words shared with the previous chunk so a sentence is not cut in two.
+KB_CHUNK_WORDS = int(os.getenv("KB_CHUNK_WORDS", 120))
+KB_CHUNK_OVERLAP = int(os.getenv("KB_CHUNK_OVERLAP", 20))
+# Characters per chunk at most; text without spaces (Chinese, Japanese) is cut at this length.
+KB_CHUNK_CHARS = int(os.getenv("KB_CHUNK_CHARS", 1500))
+# Indexes kept in each process, keyed by the hash of the knowledge-base text.
+KB_INDEX_CACHE_SIZE = int(os.getenv("KB_INDEX_CACHE_SIZE", 32))
+
+# Combining marks (Devanagari vowel signs, accents) belong to the word they follow, but \w leaves them out
+MARKS = "".join(chr(code) for code in range(0x300, 0x10000) if unicodedata.category(chr(code)).startswith("M"))
+# Chinese and Japanese are written without spaces, so each character is a term of its own
+IDEOGRAPHS = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+TOKEN = re.compile(rf"[{IDEOGRAPHS}]|(?:(?![{IDEOGRAPHS}])[\w{re.escape(MARKS)}])+", re.UNICODE)
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with "
+    "you your we our us can may not no if do does".split()
+)
+
+def tokenize(text: str) -> list:
+    return [token for token in TOKEN.findall(text.lower()) if token not in STOP_WORDS]
+
+def chunk_text(text: str, chunk_words: int = KB_CHUNK_WORDS, overlap: int = KB_CHUNK_OVERLAP,
+               chunk_chars: int = KB_CHUNK_CHARS) -> list:
+    words = text.split()
+    step = max(chunk_words - overlap, 1)
+    chunks = []
+    for start in range(0, max(len(words) - overlap, 1), step):
+        chunk = " ".join(words[start:start + chunk_words])
+        # A window of few but very long words is cut by length so every chunk fits a prompt
+        chunks.extend(chunk[offset:offset + chunk_chars] for offset in range(0, max(len(chunk), 1), max(chunk_chars, 1)))
+    return chunks
+
+#------------------------------BM25-Index----------------------------#
+class BM25Index:
+    """Okapi BM25 over the chunks of one knowledge base.
+
+    Postings are stored per term as flat numpy arrays (chunk ids and term
+    frequencies sliced by `indptr`), so scoring a query touches only the
+    postings of its terms.
+    """
+
+    def __init__(self, chunks: list, k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.vocabulary = {}
+        term_ids, chunk_ids = [], []
+        for chunk_id, chunk in enumerate(chunks):
+            for token in tokenize(chunk):
+                term_ids.append(self.vocabulary.setdefault(token, len(self.vocabulary)))
+                chunk_ids.append(chunk_id)
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+        self.lengths = np.bincount(chunk_ids, minlength=len(chunks)).astype(np.float64)
+        self.average_length = self.lengths.mean() if len(chunks) else 0.0
+        # One posting per (term, chunk) pair, sorted by term
+        pairs, frequencies = np.unique(term_ids * len(chunks) + chunk_ids, return_counts=True)
+        self.posting_chunks = pairs % max(len(chunks), 1)
+        self.posting_frequencies = frequencies.astype(np.float64)
+        document_frequencies = np.bincount(pairs // max(len(chunks), 1), minlength=len(self.vocabulary))
+        self.indptr = np.concatenate(([0], np.cumsum(document_frequencies)))
+        self.idf = np.log1p((len(chunks) - document_frequencies + 0.5) / (document_frequencies + 0.5))
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.chunks))
+        if not self.chunks or not self.average_length:
+            return scores
+        norms = self.k1 * (1 - self.b + self.b * self.lengths / self.average_length)
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, stop = self.indptr[term_id], self.indptr[term_id + 1]
+            chunk_ids = self.posting_chunks[start:stop]
+            frequencies = self.posting_frequencies[start:stop]
+            scores[chunk_ids] += self.idf[term_id] * frequencies * (self.k1 + 1) / (frequencies + norms[chunk_ids])
+        return scores
+
+    def top_k(self, query: str, k: int = KB_TOP_K) -> list:
+        """Indexes of the `k` best chunks, highest score first; chunks scoring zero are left out."""
+        scores = self.scores(query)
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [int(index) for index in best if scores[index] > 0]
+
+#----------------------------Index-Cache-----------------------------#
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+def get_index(text: str) -> BM25Index:
+    """Index of a knowledge base, built once per process for the same text."""
+    key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+    index = BM25Index(chunk_text(text))
+    with _indexes_lock:
+        _indexes[key] = index
+        while len(_indexes) > KB_INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return index
+
+def relevant_knowledge(knowledge_base: str, query: str, k: int = KB_TOP_K, max_chars: int = KB_PROMPT_CHARS) -> str:
+    """The part of a knowledge base worth sending with a prompt.
+
+    Short knowledge bases are returned whole. Longer ones are cut down to the
+    `k` chunks that best match `query`, kept in document order and capped
+    at `max_chars`, so prompt size no longer grows with the document.
+    """
+    if not knowledge_base or len(knowledge_base) <= max_chars:
+        return knowledge_base
+    index = get_index(knowledge_base)
+    best = index.top_k(query, k)
+    if not best:
+        # Nothing matched the campaign details; the opening of the document is the best guess
+        best = list(range(min(k, len(index.chunks))))
+    # Fill the budget best chunk first, then restore reading order
+    selected, size = [], 0
+    for chunk_id in best:
+        if size + len(index.chunks[chunk_id]) > max_chars:
+            break
+        selected.append(chunk_id)
+        size += len(index.chunks[chunk_id]) + 5
+    if not selected:
+        # Even the best chunk is over budget
+        return knowledge_base[:max_chars]
+    return "\n...\n".join(index.chunks[chunk_id] for chunk_id in sorted(selected))
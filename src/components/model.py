@@ -1,35 +1,172 @@
 import os
 import json
-from openai import OpenAI
+import atexit
+import random
+import asyncio
+from types import SimpleNamespace
+from openai import AsyncOpenAI, RateLimitError, APIConnectionError, APITimeoutError, InternalServerError
 from dotenv import load_dotenv
 from src.logger.log import Log_class
+from src.user_utils.async_bridge import background_loop
+from src.components.response_cache import response_cache, response_key
 
 load_dotenv()
 logg_obj = Log_class("logs", "Model.txt")
 
+# Chat model used for template generation.
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+MODEL_PARAMS = {"max_tokens": 800, "response_format": {"type": "json_object"}}
+# "openai", or "stub" to answer locally for offline load tests.
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "openai")
+# Model requests in flight per process; the shared client never opens more connections than this.
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", 16))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", 60))
+# Retries on rate limits and transient errors, with jittered exponential backoff.
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 4))
+OPENAI_RETRY_BASE_DELAY = float(os.getenv("OPENAI_RETRY_BASE_DELAY", 1.0))
+OPENAI_RETRY_MAX_DELAY = float(os.getenv("OPENAI_RETRY_MAX_DELAY", 30.0))
+# Simulated response time of the stub backend.
+STUB_LATENCY_SECONDS = float(os.getenv("STUB_LATENCY_SECONDS", 0.5))
+
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+#---------------------------Stub-Backend-----------------------------#
+class StubChatClient:
+    """Answers chat completions locally with the shape of an OpenAI response."""
+
+    def __init__(self, latency: float = None):
+        self.latency = STUB_LATENCY_SECONDS if latency is None else latency
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, messages, **params):
+        await asyncio.sleep(self.latency)
+        content = json.dumps({
+            "template_1": 'f"Hello, this is a scheduled call regarding your account."',
+            "template_2": 'f"Hi there, just a quick call about your account."',
+            "template_3": 'f"Great news! We are calling with an update on your account."',
+        })
+        prompt_tokens = len(json.dumps(messages)) // 4
+        completion_tokens = len(content) // 4
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                  total_tokens=prompt_tokens + completion_tokens),
+        )
+
+    async def close(self):
+        pass
+
+#-----------------------Shared-Model-Client--------------------------#
+class ModelClient:
+    """One async OpenAI client per process, bound to the shared background loop.
+
+    Its connection pool is reused by every template generation, a semaphore
+    caps the requests in flight, and rate limits are retried with jittered
+    backoff instead of surfacing to the caller.
+    """
+    _instance = None
+    _client = None
+    _semaphore = None
+    _init_lock = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ModelClient, cls).__new__(cls)
+        return cls._instance
+
+    async def get_client(self):
+        """Return the shared client; must be awaited on the background loop."""
+        if self._client is None:
+            if ModelClient._init_lock is None:
+                ModelClient._init_lock = asyncio.Lock()
+            async with self._init_lock:
+                if self._client is None:
+                    if MODEL_BACKEND == "stub":
+                        ModelClient._client = StubChatClient()
+                        logg_obj.Info_Log("Using the stub model backend.")
+                    else:
+                        OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+                        if not OPENAI_API_KEY:
+                            logg_obj.Error_Log("OpenAI API key is missing. Please set it as an environment variable.")
+                            raise ValueError("OpenAI API key is missing. Set it as an environment variable.")
+                        # Retries are handled in complete() so they share the semaphore and jitter
+                        ModelClient._client = AsyncOpenAI(api_key=OPENAI_API_KEY, timeout=OPENAI_TIMEOUT, max_retries=0)
+                        logg_obj.Info_Log("Shared OpenAI API client created.")
+                    ModelClient._semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+                    atexit.register(self.close)
+        return self._client
+
+    def retry_delay(self, error, attempt: int) -> float:
+        # Full jitter keeps many rate-limited requests from retrying in lockstep
+        delay = random.uniform(0, min(OPENAI_RETRY_MAX_DELAY, OPENAI_RETRY_BASE_DELAY * (2 ** attempt)))
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        try:
+            return max(delay, float(retry_after)) if retry_after else delay
+        except ValueError:
+            return delay
+
+    async def complete(self, messages, model: str = OPENAI_MODEL, **params):
+        client = await self.get_client()
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    return await client.chat.completions.create(model=model, messages=messages, **params)
+            except RETRYABLE_ERRORS as e:
+                if attempt >= OPENAI_MAX_RETRIES:
+                    raise
+                delay = self.retry_delay(e, attempt)
+                attempt += 1
+                logg_obj.Info_Log(f"OpenAI request failed ({type(e).__name__}), retry {attempt} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    def run(self, coro, timeout=None):
+        """Sync bridge: run a coroutine on the shared loop from a Flask handler."""
+        return background_loop.run(coro, timeout)
+
+    def submit(self, coro):
+        return background_loop.submit(coro)
+
+    def close(self):
+        try:
+            background_loop.run(self.aclose(), timeout=5)
+        except Exception as e:
+            logg_obj.Error_Log(f"Failed to close model client: {str(e)}")
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+        ModelClient._client = None
+
+# Create a singleton instance
+model_client = ModelClient()
+
 class OpenAIModel:
-    def __init__(self):
-        logg_obj.Info_Log("Loading OpenAI API key from environment variables.")
-        OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-        if not OPENAI_API_KEY:
-            logg_obj.Error_Log("OpenAI API key is missing. Please set it as an environment variable.")
-            raise ValueError("OpenAI API key is missing. Set it as an environment variable.")
-
-        # Load the OpenAI client
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
-        logg_obj.Info_Log("OpenAI API client successfully loaded.")
-
-    def run(self,prompt):
+    """Template-generation calls on the shared model client; cheap to construct per request."""
+
+    def run(self,prompt,use_cache=True):
+        """Blocking wrapper around arun for sync callers."""
+        return model_client.run(self.arun(prompt, use_cache))
+
+    async def arun(self,prompt,use_cache=True):
+        # Identical model, parameters and messages reuse the stored response
+        cache_key = response_key(OPENAI_MODEL, MODEL_PARAMS, prompt)
+        if use_cache:
+            try:
+                # Mongo calls run off the loop so other requests keep flowing
+                cached = await asyncio.to_thread(response_cache.get, cache_key)
+                if cached is not None:
+                    logg_obj.Info_Log("Returning cached OpenAI response.")
+                    return cached
+            except Exception as e:
+                logg_obj.Error_Log(f"Response cache lookup failed: {str(e)}")
+
         logg_obj.Info_Log("Initiating call to OpenAI API")
 
         # Call OpenAI API
         try:
-            response = self.client.chat.completions.create(
-                model= "gpt-4o-mini",
-                messages = prompt,
-                max_tokens=800,
-                response_format={"type": "json_object"},
-            )
+            response = await model_client.complete(prompt, OPENAI_MODEL, **MODEL_PARAMS)
             logg_obj.Info_Log("OpenAI API response received successfully.")
 
             # FIX: Ensure API response is valid and clean up any unwanted markdown characters
@@ -61,6 +198,14 @@ class OpenAIModel:
             logg_obj.Info_Log(f"input_tokens:{usage.prompt_tokens}")
             logg_obj.Info_Log(f"output_tokens:{usage.completion_tokens}")
             logg_obj.Info_Log(f"total_tokens:{usage.total_tokens}")
+            try:
+                await asyncio.to_thread(response_cache.put, cache_key, json_response, OPENAI_MODEL, {
+                    "prompt_tokens": usage.prompt_tokens,
+                    "completion_tokens": usage.completion_tokens,
+                    "total_tokens": usage.total_tokens,
+                })
+            except Exception as e:
+                logg_obj.Error_Log(f"Response cache store failed: {str(e)}")
             return json_response
 
         except Exception as e:
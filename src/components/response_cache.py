@@ -0,0 +1,130 @@
+import os
+import re
+import json
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from pymongo import DESCENDING
+from src.database.mongodb import db
+from src.logger.log import Log_class
+
+logg_obj = Log_class("logs", "response_cache.txt")
+
+# Seconds a model response is reused; 0 disables the cache.
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+# Responses kept; the least recently used are evicted past this.
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 10000))
+
+WHITESPACE = re.compile(r"\s+")
+
+def normalize_messages(messages):
+    """Collapse whitespace in message text so re-indenting a prompt keeps its key."""
+    if isinstance(messages, str):
+        return WHITESPACE.sub(" ", messages).strip()
+    if isinstance(messages, list):
+        return [normalize_messages(message) for message in messages]
+    if isinstance(messages, dict):
+        return {key: normalize_messages(value) for key, value in messages.items()}
+    return messages
+
+def response_key(model: str, params: dict, messages) -> str:
+    payload = json.dumps({"model": model, "params": params, "messages": normalize_messages(messages)},
+                         sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+#---------------------------Response-Cache---------------------------#
+class ResponseCache:
+    """Model responses in Mongo keyed by a hash of model, parameters and messages.
+
+    Entries expire through a TTL index on expires_at (and are ignored once
+    past it even before Mongo removes them); the least recently used are
+    evicted when the collection outgrows `max_entries`.
+    """
+
+    def __init__(self, ttl_seconds: int = LLM_CACHE_TTL_SECONDS, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.indexes_ready = False
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "tokens_saved": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def ensure_indexes(self):
+        if not self.indexes_ready:
+            db.llm_responses.create_index("expires_at", expireAfterSeconds=0)
+            db.llm_responses.create_index([("last_used_at", DESCENDING)])
+            self.indexes_ready = True
+
+    def count(self, name: str, amount: int = 1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def get(self, key: str):
+        if not self.enabled:
+            return None
+        now = datetime.utcnow()
+        entry = db.llm_responses.find_one_and_update(
+            {"_id": key, "expires_at": {"$gt": now}},
+            {"$set": {"last_used_at": now}, "$inc": {"hits": 1}},
+            {"response": 1, "usage": 1},
+        )
+        if entry is None:
+            self.count("misses")
+            return None
+        self.count("hits")
+        self.count("tokens_saved", (entry.get("usage") or {}).get("total_tokens") or 0)
+        return entry["response"]
+
+    def put(self, key: str, response, model: str, usage: dict = None):
+        if not self.enabled:
+            return
+        self.ensure_indexes()
+        now = datetime.utcnow()
+        # A refreshed response keeps the hit count of the one it replaces
+        db.llm_responses.update_one({"_id": key}, {
+            "$set": {
+                "response": response,
+                "model": model,
+                "usage": usage or {},
+                "created_at": now,
+                "last_used_at": now,
+                "expires_at": now + timedelta(seconds=self.ttl_seconds),
+            },
+            "$setOnInsert": {"hits": 0},
+        }, upsert=True)
+        self.count("stores")
+        self.evict()
+
+    def evict(self):
+        # estimated_document_count reads collection metadata, so the common case costs no scan
+        excess = db.llm_responses.estimated_document_count() - self.max_entries
+        if excess <= 0:
+            return
+        oldest = [entry["_id"] for entry in db.llm_responses.find({}, {"_id": 1}).sort("last_used_at", 1).limit(excess)]
+        if oldest:
+            self.count("evictions", db.llm_responses.delete_many({"_id": {"$in": oldest}}).deleted_count)
+
+    def stats(self) -> dict:
+        with self.lock:
+            counters = dict(self.counters)
+        lookups = counters["hits"] + counters["misses"]
+        # Totals over every process sharing the collection
+        stored = next(db.llm_responses.aggregate([{"$group": {
+            "_id": None,
+            "entries": {"$sum": 1},
+            "hits": {"$sum": "$hits"},
+            "tokens_saved": {"$sum": {"$multiply": ["$hits", "$usage.total_tokens"]}},
+        }}]), None) or {"entries": 0, "hits": 0, "tokens_saved": 0}
+        stored.pop("_id", None)
+        return {
+            **counters,
+            "hit_rate": round(counters["hits"] / lookups, 3) if lookups else None,
+            "stored": stored,
+            "ttl_seconds": self.ttl_seconds,
+            "max_entries": self.max_entries,
+        }
+
+response_cache = ResponseCache()
@@ -1,4 +1,5 @@
 import json
+from src.components.kb_index import relevant_knowledge
 
 def get_campaign_prompt(campaign_columns,camapign_data):
     campaign_name = camapign_data.get("campaign_name")
@@ -7,6 +8,10 @@ def get_campaign_prompt(campaign_columns,camapign_data):
     system_prompt = camapign_data.get("system_prompt")
     first_line =  camapign_data.get("first_line")
     tone = camapign_data.get("tone")
+    # Long knowledge bases are cut down to the chunks that match the campaign
+    knowledge_base = relevant_knowledge(
+        knowledge_base, " ".join(str(value) for value in [campaign_name, campaign_description, system_prompt, first_line, *campaign_columns] if value)
+    )
     response_format={
                         "template_1": "f-string template data",
                         "template_2": "f-string template data",
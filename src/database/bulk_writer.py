@@ -0,0 +1,114 @@
+import os
+import queue
+import threading
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError
+from src.logger.log import Log_class
+
+logg_obj = Log_class("logs", "bulk_writer.txt")
+
+# Documents per insert_many request.
+BULK_INSERT_CHUNK_SIZE = int(os.getenv("BULK_INSERT_CHUNK_SIZE", 1000))
+# Chunks allowed to wait for a writer before the producer blocks.
+BULK_INSERT_MAX_PENDING = int(os.getenv("BULK_INSERT_MAX_PENDING", 4))
+# Threads issuing inserts concurrently.
+BULK_INSERT_WORKERS = int(os.getenv("BULK_INSERT_WORKERS", 2))
+
+#----------------------------Bulk-Writer-----------------------------#
+class BulkWriter:
+    """Insert documents in fixed-size unordered chunks from background threads.
+
+    The producer keeps rendering while earlier chunks are being written; the
+    bounded queue makes it wait when the writers fall behind, so at most
+    `max_pending` chunks are held in memory. `on_progress(inserted)` is called
+    after every chunk that lands.
+    """
+
+    def __init__(self, collection: Collection, chunk_size: int = BULK_INSERT_CHUNK_SIZE,
+                 max_pending: int = BULK_INSERT_MAX_PENDING, workers: int = BULK_INSERT_WORKERS,
+                 on_progress=None):
+        self.collection = collection
+        self.chunk_size = max(1, int(chunk_size))
+        self.on_progress = on_progress
+        self.inserted = 0
+        self.errors = []
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.queue = queue.Queue(maxsize=max(1, int(max_pending)))
+        self.threads = [threading.Thread(target=self.worker, daemon=True) for _ in range(max(1, int(workers)))]
+        for thread in self.threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort(f"{exc_type.__name__}: {exc}")
+        self.close()
+        return False
+
+    def worker(self):
+        while True:
+            chunk = self.queue.get()
+            try:
+                if chunk is None:
+                    return
+                if self.errors:
+                    # A chunk already failed: drain the queue without writing
+                    continue
+                try:
+                    inserted = len(self.collection.insert_many(chunk, ordered=False).inserted_ids)
+                except BulkWriteError as e:
+                    inserted = e.details.get("nInserted", 0)
+                    self.fail(f"{len(e.details.get('writeErrors', []))} documents rejected")
+                except Exception as e:
+                    inserted = 0
+                    self.fail(str(e))
+                with self.lock:
+                    self.inserted += inserted
+                    # Reported under the lock so progress never goes backwards
+                    if inserted and self.on_progress is not None:
+                        self.on_progress(self.inserted)
+            finally:
+                self.queue.task_done()
+
+    def fail(self, error: str):
+        logg_obj.Error_Log(f"Bulk insert into {self.collection.name} failed: {error}")
+        with self.lock:
+            self.errors.append(error)
+
+    def add(self, document: dict):
+        self.buffer.append(document)
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+
+    def extend(self, documents):
+        for document in documents:
+            self.add(document)
+
+    def flush(self):
+        if self.buffer:
+            chunk, self.buffer = self.buffer, []
+            # Blocks while max_pending chunks are already waiting
+            self.queue.put(chunk)
+
+    def abort(self, error: str):
+        """Drop the buffer and every chunk not yet picked up by a writer."""
+        self.fail(f"aborted: {error}")
+        self.buffer = []
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+            self.queue.task_done()
+
+    def close(self) -> int:
+        """Write what is left, stop the writers and return the number of inserted documents."""
+        self.flush()
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        return self.inserted
@@ -0,0 +1,113 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import pandas as pd
+from src.logger.log import Log_class
+
+logg_obj = Log_class("logs", "frame_cache.txt")
+
+# Memory budget for parsed contact files kept in the process.
+DATAFRAME_CACHE_BYTES = int(os.getenv("DATAFRAME_CACHE_BYTES", 256 * 1024 * 1024))
+# Directory for Parquet copies of parsed files so a restart skips re-parsing; unset disables the spill.
+DATAFRAME_SPILL_DIR = os.getenv("DATAFRAME_SPILL_DIR")
+
+def frame_key(file_info: dict) -> str:
+    """Cache key of a GridFS file; a re-upload under the same id gets a new key."""
+    upload_date = file_info.get("uploadDate")
+    return ":".join([
+        str(file_info["_id"]),
+        str(file_info.get("md5") or file_info.get("length")),
+        upload_date.isoformat() if upload_date else "",
+    ])
+
+#----------------------------Frame-Cache-----------------------------#
+class FrameCache:
+    """LRU of parsed DataFrames bounded by their in-memory size.
+
+    Frames are returned as copies so callers can rename or filter them freely.
+    """
+
+    def __init__(self, max_bytes: int = DATAFRAME_CACHE_BYTES, spill_dir: str = DATAFRAME_SPILL_DIR):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.frames = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.counters = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+
+    def get_or_load(self, key: str, loader) -> pd.DataFrame:
+        with self.lock:
+            entry = self.frames.get(key)
+            if entry is not None:
+                self.frames.move_to_end(key)
+                self.counters["hits"] += 1
+                return entry[0].copy()
+        df = self.read_spill(key)
+        if df is not None:
+            with self.lock:
+                self.counters["disk_hits"] += 1
+        else:
+            with self.lock:
+                self.counters["misses"] += 1
+            df = loader()
+            self.write_spill(key, df)
+        self.put(key, df)
+        return df.copy()
+
+    def put(self, key: str, df: pd.DataFrame):
+        nbytes = int(df.memory_usage(deep=True).sum())
+        if nbytes > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.frames:
+                self.size -= self.frames.pop(key)[1]
+            self.frames[key] = (df, nbytes)
+            self.size += nbytes
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self.frames.popitem(last=False)
+                self.size -= evicted
+                self.counters["evictions"] += 1
+
+    def spill_path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".parquet")
+
+    def read_spill(self, key: str):
+        if not self.spill_dir:
+            return None
+        path = self.spill_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            return pd.read_parquet(path)
+        except Exception as e:
+            logg_obj.Error_Log(f"Ignoring unreadable spill file {path}: {str(e)}")
+            return None
+
+    def write_spill(self, key: str, df: pd.DataFrame):
+        if not self.spill_dir:
+            return
+        path = self.spill_path(key)
+        try:
+            # Write then rename so a concurrent reader never sees a partial file
+            df.to_parquet(path + ".tmp", index=False)
+            os.replace(path + ".tmp", path)
+        except Exception as e:
+            # Columns mixing numbers and text cannot be stored as Parquet; the memory cache still applies
+            logg_obj.Error_Log(f"Could not spill {key}: {str(e)}")
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.counters["hits"] + self.counters["disk_hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_rate": round((self.counters["hits"] + self.counters["disk_hits"]) / lookups, 3) if lookups else None,
+                "entries": len(self.frames),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "spill_dir": self.spill_dir,
+            }
+
+frame_cache = FrameCache()
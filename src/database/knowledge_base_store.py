@@ -0,0 +1,96 @@
+import os
+import hashlib
+from functools import lru_cache
+from datetime import datetime
+from pymongo import ReturnDocument
+from src.database.mongodb import db
+from src.logger.log import Log_class
+from src.user_utils.kb_extractor import KB_EXTRACTOR_VERSION
+
+logg_obj = Log_class("logs", "knowledge_base_store.txt")
+
+# Knowledge-base texts kept decoded in each process.
+KB_TEXT_CACHE_SIZE = int(os.getenv("KB_TEXT_CACHE_SIZE", 32))
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+#------------------------Content-Addressed-Text----------------------#
+def find_knowledge_base(kb_hash: str, user_id: str = None):
+    """Stored knowledge base for a content hash, or None if missing or extracted by an older version.
+
+    With `user_id` only a knowledge base that user has uploaded is returned.
+    """
+    query = {"_id": kb_hash, "extractor_version": KB_EXTRACTOR_VERSION}
+    if user_id is not None:
+        query["uploaded_by"] = user_id
+    return db.knowledge_bases.find_one(query)
+
+@lru_cache(maxsize=KB_TEXT_CACHE_SIZE)
+def read_text(text_file_id: str) -> str:
+    # A text file is never rewritten (a new extraction gets a new file), so caching by id is safe
+    data, _ = db.get_file(text_file_id)
+    return data.decode("utf-8")
+
+def get_knowledge_base_text(kb_hash: str):
+    entry = find_knowledge_base(kb_hash)
+    if entry is None:
+        return None
+    try:
+        return read_text(entry["text_file_id"])
+    except Exception as e:
+        logg_obj.Error_Log(f"Knowledge base {kb_hash} has no readable text: {str(e)}")
+        return None
+
+def touch_knowledge_base(kb_hash: str, user_id: str):
+    """Record a re-upload: the uploader may now reference the knowledge base from campaigns."""
+    db.knowledge_bases.update_one(
+        {"_id": kb_hash},
+        {"$addToSet": {"uploaded_by": user_id}, "$set": {"last_used_at": datetime.utcnow()}, "$inc": {"uploads": 1}},
+    )
+
+def store_knowledge_base(kb_hash: str, text: str, filename: str, file_type: str, size: int, user_id: str):
+    """Store extracted text under the hash of the uploaded bytes.
+
+    The text goes to GridFS since a long manual can exceed the document size
+    limit. When two uploads race, the last write wins and the text file it
+    replaced is deleted.
+    """
+    text_file_id = db.store_file(text.encode("utf-8"), f"{kb_hash}.txt", metadata={
+        "file_type": "txt",
+        "purpose": "knowledge_base_text",
+        "content_hash": kb_hash,
+        "uploaded_at": datetime.utcnow(),
+    })
+    now = datetime.utcnow()
+    previous = db.knowledge_bases.find_one_and_update(
+        {"_id": kb_hash},
+        {
+            "$set": {
+                "text_file_id": text_file_id,
+                "extractor_version": KB_EXTRACTOR_VERSION,
+                "filename": filename,
+                "file_type": file_type,
+                "size": size,
+                "text_length": len(text),
+                "last_used_at": now,
+            },
+            "$setOnInsert": {"created_at": now},
+            "$addToSet": {"uploaded_by": user_id},
+            "$inc": {"uploads": 1},
+        },
+        upsert=True,
+        return_document=ReturnDocument.BEFORE,
+    )
+    if previous and previous.get("text_file_id") not in (None, text_file_id):
+        db.delete_file(previous["text_file_id"])
+
+def resolve_knowledge_base(campaign_data: dict):
+    """Knowledge-base text of a campaign, whether referenced by hash or embedded."""
+    kb_hash = campaign_data.get("knowledge_base_id")
+    if kb_hash:
+        text = get_knowledge_base_text(kb_hash)
+        if text is None:
+            raise ValueError(f"Knowledge base {kb_hash} not found; upload the file again")
+        return text
+    return campaign_data.get("knowledge_base")
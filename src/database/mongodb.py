@@ -7,8 +7,13 @@ from gridfs import GridFS
 from dotenv import load_dotenv
 import pandas as pd
 import io
+from src.user_utils.phone_numbers import clean_contacts
+from src.database.frame_cache import frame_cache, frame_key
+from src.user_utils.excel_reader import read_excel_frame
+from src.logger.log import Log_class
 
 load_dotenv()
+logg_obj = Log_class("logs", "mongodb.txt")
 
 class MongoDB:
     _instance = None
@@ -55,6 +60,26 @@ class MongoDB:
     def campaign_template(self) -> Collection:
         return self._db["campaign_template"]
 
+    @property
+    def call_batch_runs(self) -> Collection:
+        return self._db["call_batch_runs"]
+
+    @property
+    def call_batch_leases(self) -> Collection:
+        return self._db["call_batch_leases"]
+
+    @property
+    def do_not_call(self) -> Collection:
+        return self._db["do_not_call"]
+
+    @property
+    def knowledge_bases(self) -> Collection:
+        return self._db["knowledge_bases"]
+
+    @property
+    def llm_responses(self) -> Collection:
+        return self._db["llm_responses"]
+
     def store_file(self, file_data: bytes, filename: str, metadata: Dict[str, Any] = None) -> str:
         """Store a file in GridFS and return its file_id."""
         try:
@@ -75,9 +100,28 @@ class MongoDB:
         except Exception as e:
             raise
 
+    def get_file_info(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """Return the GridFS file document (metadata, length, uploadDate) without reading its chunks."""
+        try:
+            return self._db["fs.files"].find_one({"_id": ObjectId(file_id)})
+        except Exception as e:
+            return None
+
+    def update_file_metadata(self, file_id: str, fields: Dict[str, Any], query: Dict[str, Any] = None) -> bool:
+        """Set metadata fields on a stored file; `query` adds conditions to the match."""
+        result = self._db["fs.files"].update_one(
+            {"_id": ObjectId(file_id), **(query or {})},
+            {"$set": {f"metadata.{key}": value for key, value in fields.items()}},
+        )
+        return result.modified_count > 0
+
     def delete_file(self, file_id: str) -> bool:
         """Delete a file from GridFS by its ID."""
         try:
+            file_info = self.get_file_info(file_id) or {}
+            columnar_file_id = (file_info.get("metadata") or {}).get("columnar_file_id")
+            if columnar_file_id:
+                self._fs.delete(ObjectId(columnar_file_id))
             self._fs.delete(ObjectId(file_id))
             return True
         except Exception as e:
@@ -92,24 +136,64 @@ db = MongoDB()
 
 
 #-----------------GET-DF---------------------#
-def get_dataframe(file_id: str):
+def parse_file(file_id: str) -> pd.DataFrame:
+    data, meta = db.get_file(file_id)
+    file_type = meta.get('file_type')
+    file_stream = io.BytesIO(data)
+    if file_type == 'csv':
+        df = pd.read_csv(file_stream)
+    elif file_type == '.csv':
+        df = pd.read_csv(file_stream)
+    elif file_type in ['xls', 'xlsx', '.xls', '.xlsx']:
+        if meta.get('columnar_file_id'):
+            # Converted on an earlier read; Parquet loads in a fraction of the Excel parse time
+            columnar_data, _ = db.get_file(meta['columnar_file_id'])
+            return pd.read_parquet(io.BytesIO(columnar_data))
+        df = read_excel_frame(data, file_type.lstrip('.'), sheets=meta.get('sheets'))
+        store_columnar_copy(file_id, df)
+    else:
+        raise ValueError(f"Unsupported file type: {file_type}")
+    return df
+
+def store_columnar_copy(file_id: str, df: pd.DataFrame):
+    """Keep a Parquet copy of a parsed Excel file next to it in GridFS, once."""
     try:
-        data, meta = db.get_file(file_id)
-        file_type = meta.get('file_type')
-        file_stream = io.BytesIO(data)
-        if file_type == 'csv':
-            df = pd.read_csv(file_stream)
-        elif file_type == '.csv':
-            df = pd.read_csv(file_stream)
-        elif file_type in ['xls', 'xlsx']:
-            df = pd.read_excel(file_stream)
-        elif file_type in ['.xls', '.xlsx']:
-            df = pd.read_excel(file_stream)
-        else:
-            raise ValueError(f"Unsupported file type: {file_type}")
-
-        return df
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, index=False)
+    except Exception as e:
+        # Columns mixing numbers and text cannot be stored as Parquet; such files are parsed each time
+        logg_obj.Warning_Log(f"Skipping columnar copy of {file_id}: {str(e)}")
+        return
+    columnar_file_id = db.store_file(buffer.getvalue(), f"{file_id}.parquet", metadata={
+        "file_type": "parquet", "purpose": "columnar_copy", "source_file_id": file_id,
+    })
+    # Another process may have converted the same file meanwhile; keep only one copy
+    if not db.update_file_metadata(file_id, {"columnar_file_id": columnar_file_id},
+                                   query={"metadata.columnar_file_id": {"$exists": False}}):
+        db.delete_file(columnar_file_id)
+
+def get_dataframe(file_id: str, clean: bool = True):
+    """Read a stored contact file into a DataFrame.
+
+    Parsed files are cached (see frame_cache) under the file's id, checksum and
+    upload date, so repeated reads skip the download and the parse.
+    With `clean`, phone numbers are normalized to E.164 and invalid or duplicate
+    rows are dropped; the ingest report is kept in df.attrs["contact_report"].
+    """
+    try:
+        file_info = db.get_file_info(file_id)
+        if file_info is None:
+            raise ValueError(f"File not found: {file_id}")
+        key = frame_key(file_info)
+        if not clean:
+            return frame_cache.get_or_load(key, lambda: parse_file(file_id))
+
+        def load_clean():
+            df, report = clean_contacts(frame_cache.get_or_load(key, lambda: parse_file(file_id)))
+            df.attrs["contact_report"] = report
+            return df
+        # The cleaned frame is cached too, so a hit also skips phone normalization
+        return frame_cache.get_or_load(f"{key}:clean", load_clean)
     except Exception as e :
         print(str(e))
         return None
-
@@ -0,0 +1,199 @@
+import os
+import uuid
+import threading
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from src.database.mongodb import db
+from src.logger.log import Log_class
+
+logg_obj = Log_class("logs", "batch_state.txt")
+
+# Per-contact dispatch states stored in call_batch_details.dispatch_status
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+DISPATCHED = "dispatched"
+FAILED = "failed"
+SKIPPED = "skipped"
+# In flight when a run crashed: possibly dialed, so never redialed automatically
+INTERRUPTED = "interrupted"
+
+# A running batch whose heartbeat is older than this is treated as crashed.
+BATCH_RUN_STALE_SECONDS = int(os.getenv("BATCH_RUN_STALE_SECONDS", 300))
+HEARTBEAT_INTERVAL_SECONDS = 60
+
+_indexes_ready = False
+
+def ensure_indexes():
+    global _indexes_ready
+    if not _indexes_ready:
+        db.call_batch_runs.create_index([("created_by", 1), ("batch_name", 1)], unique=True)
+        db.call_batch_details.create_index([("created_by", 1), ("batch_name", 1), ("dispatch_status", 1)])
+        _indexes_ready = True
+
+def pending_filter(released_before: datetime = None):
+    # Contacts created before dispatch tracking have no dispatch_status yet
+    query = {"dispatch_status": {"$in": [None, PENDING]}}
+    if released_before is not None:
+        # Contacts spread over a calling window wait for their release time,
+        # and redials wait out their backoff
+        query["$and"] = [
+            {"$or": [{"release_at": None}, {"release_at": {"$lte": released_before}}]},
+            {"$or": [{"next_attempt_at": None}, {"next_attempt_at": {"$lte": released_before}}]},
+        ]
+    return query
+
+#-------------------------Batch-Checkpoint---------------------------#
+class BatchCheckpoint:
+    """Tracks one run of a call batch so it can be resumed after a crash.
+
+    A run is a document in call_batch_runs; at most one live run exists per
+    batch. Contacts move pending -> in_flight -> dispatched/failed/skipped,
+    and the transitions are written in bulk as the engine progresses.
+    """
+
+    def __init__(self, user_id: str, batch_name: str):
+        self.user_id = user_id
+        self.batch_name = batch_name
+        self.run_id = uuid.uuid4().hex
+        self.batch_query = {"created_by": user_id, "batch_name": batch_name}
+        # Set once another run owns the batch; the engine stops dispatching when it is
+        self.lost = threading.Event()
+
+    def acquire(self, config: dict = None) -> bool:
+        """Claim the batch for this run; False when another live run already owns it.
+
+        `config` is stored on the run document for dispatch workers that pick
+        the batch up in distributed mode.
+        """
+        ensure_indexes()
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=BATCH_RUN_STALE_SECONDS)
+        run = {"state": "running", "run_id": self.run_id, "started_at": now, "heartbeat_at": now}
+        if config is not None:
+            run["config"] = config
+        try:
+            db.call_batch_runs.find_one_and_update(
+                {
+                    **self.batch_query,
+                    "$or": [{"state": {"$ne": "running"}}, {"heartbeat_at": {"$lt": stale}}],
+                },
+                {"$set": run, "$unset": {"summary": "", "finished_at": ""}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            # The unique index rejected the upsert: a live run holds the batch
+            return False
+
+    def recover(self) -> int:
+        """Park contacts left in flight by a crashed run; they may already have been dialed."""
+        result = db.call_batch_details.update_many(
+            {**self.batch_query, "dispatch_status": IN_FLIGHT},
+            {
+                "$set": {"dispatch_status": INTERRUPTED, "dispatch_error": "Interrupted before dispatch was confirmed"},
+                "$inc": {"attempts": 1},
+                "$unset": {"next_attempt_at": ""},
+            },
+        )
+        if result.modified_count:
+            logg_obj.Info_Log(f"{self.batch_name}: marked {result.modified_count} contacts as interrupted")
+        return result.modified_count
+
+    def next_chunk(self, projection: dict, size: int) -> list:
+        """Load the next pending contacts and mark them in flight for this run.
+
+        Only the contacts this run actually claimed are returned, so a contact
+        another run took in the meantime is never dialed twice.
+        """
+        contacts = list(
+            db.call_batch_details.find({**self.batch_query, **pending_filter(datetime.now())}, projection)
+            .sort("_id", 1)
+            .limit(size)
+        )
+        claimed = self.mark_in_flight([contact["_id"] for contact in contacts])
+        return [contact for contact in contacts if contact["_id"] in claimed]
+
+    def has_pending(self, released_only: bool = True) -> bool:
+        released_before = datetime.now() if released_only else None
+        query = {**self.batch_query, **pending_filter(released_before)}
+        return db.call_batch_details.find_one(query, {"_id": 1}) is not None
+
+    def has_in_flight(self) -> bool:
+        """Whether a run, possibly a crashed one, still has contacts in flight."""
+        return db.call_batch_details.find_one({**self.batch_query, "dispatch_status": IN_FLIGHT}, {"_id": 1}) is not None
+
+    def mark_in_flight(self, contact_ids: list) -> set:
+        """Claim the contacts that are still pending and return the ids claimed."""
+        if not contact_ids:
+            return set()
+        # A token per claim tells apart what this call modified from what another run claimed
+        claim_id = uuid.uuid4().hex
+        db.call_batch_details.update_many(
+            {"_id": {"$in": contact_ids}, **pending_filter()},
+            {"$set": {"dispatch_status": IN_FLIGHT, "dispatch_run_id": self.run_id, "dispatch_claim_id": claim_id}},
+        )
+        return {contact["_id"] for contact in db.call_batch_details.find(
+            {"_id": {"$in": contact_ids}, "dispatch_claim_id": claim_id}, {"_id": 1}
+        )}
+
+    def release(self, contact_ids: list):
+        """Return contacts claimed but never dialed to pending, e.g. after the run was lost."""
+        if contact_ids:
+            db.call_batch_details.update_many(
+                {"_id": {"$in": contact_ids}, "dispatch_status": IN_FLIGHT, "dispatch_run_id": self.run_id},
+                {"$set": {"dispatch_status": PENDING}},
+            )
+
+    def flush(self, results: list):
+        """Write (contact_id, status, error, room_name) results in one unordered bulk request."""
+        if not results:
+            return
+        now = datetime.utcnow()
+        operations = []
+        for contact_id, status, error, room_name in results:
+            update = {"dispatch_status": status, "dispatch_updated_at": now}
+            if status == DISPATCHED:
+                update["dispatched_at"] = now
+                update["room_name"] = room_name
+            if error:
+                update["dispatch_error"] = error
+            # Skipped contacts were never dialed, so they do not use up a redial attempt
+            change = {"$set": update, "$unset": {"next_attempt_at": ""}}
+            if status != SKIPPED:
+                change["$inc"] = {"attempts": 1}
+            operations.append(UpdateOne({"_id": contact_id}, change))
+        db.call_batch_details.bulk_write(operations, ordered=False)
+
+    def heartbeat(self):
+        renewed = db.call_batch_runs.update_one(
+            {"run_id": self.run_id, "state": "running"}, {"$set": {"heartbeat_at": datetime.utcnow()}}
+        )
+        if not renewed.matched_count:
+            # Taken over as stale by another run
+            logg_obj.Error_Log(f"{self.batch_name}: run {self.run_id} was lost")
+            self.lost.set()
+
+    def finish(self, summary: dict, state: str = "completed"):
+        db.call_batch_runs.update_one(
+            {"run_id": self.run_id},
+            {"$set": {"state": state, "finished_at": datetime.utcnow(), "summary": summary}},
+        )
+
+def record_creation_progress(user_id: str, batch_name: str, inserted: int, total: int, state: str = "creating"):
+    """Expose how many contacts of a batch being created are stored so far (see get_batch_status)."""
+    ensure_indexes()
+    db.call_batch_runs.update_one(
+        {"created_by": user_id, "batch_name": batch_name},
+        {"$set": {"creation": {"state": state, "inserted": inserted, "total": total, "updated_at": datetime.utcnow()}}},
+        upsert=True,
+    )
+
+#---------------------------Batch-Status-----------------------------#
+def get_batch_status(user_id: str, batch_name: str) -> dict:
+    counts = db.call_batch_details.aggregate([
+        {"$match": {"created_by": user_id, "batch_name": batch_name}},
+        {"$group": {"_id": {"$ifNull": ["$dispatch_status", PENDING]}, "count": {"$sum": 1}}},
+    ])
+    run = db.call_batch_runs.find_one({"created_by": user_id, "batch_name": batch_name}, {"_id": 0})
+    return {"contacts": {item["_id"]: item["count"] for item in counts}, "run": run}
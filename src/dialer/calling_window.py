@@ -0,0 +1,145 @@
+import os
+import numpy as np
+import pandas as pd
+from datetime import datetime, time as dt_time
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from src.logger.log import Log_class
+
+logg_obj = Log_class("logs", "calling_window.txt")
+
+DEFAULT_CALLS_PER_MINUTE = 60
+# IANA zone of the server's naive datetimes (scheduledTime, release_at); defaults to TZ or /etc/localtime.
+SERVER_TIMEZONE = os.getenv("SERVER_TIMEZONE") or os.getenv("TZ", "").lstrip(":")
+
+def server_timezone():
+    """The server's real timezone, so offsets follow its DST changes instead of today's offset."""
+    names = [SERVER_TIMEZONE]
+    try:
+        link = os.path.realpath("/etc/localtime")
+        if "zoneinfo/" in link:
+            names.append(link.split("zoneinfo/", 1)[1])
+    except OSError:
+        pass
+    for name in names:
+        if not name:
+            continue
+        try:
+            return ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            continue
+    logg_obj.Error_Log("Server timezone not found; using the current UTC offset")
+    return datetime.now().astimezone().tzinfo
+
+def local_wall_clock(moment: datetime, zone, server_zone) -> datetime:
+    """Naive wall-clock time in `zone` of a moment given as naive server-local (or aware) time."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=server_zone)
+    return moment.astimezone(zone).replace(tzinfo=None)
+
+def to_server_time(wall_clock: pd.DatetimeIndex, zone, server_zone) -> np.ndarray:
+    """Naive server-local datetimes of naive wall-clock times in `zone`.
+
+    Times repeated when clocks go back resolve to the first occurrence and
+    times skipped when they go forward move to the end of the gap.
+    """
+    aware = wall_clock.tz_localize(zone, ambiguous=np.ones(len(wall_clock), dtype=bool), nonexistent="shift_forward")
+    return aware.tz_convert(server_zone).tz_localize(None).values
+
+#-------------------------Window-Parsing-----------------------------#
+def parse_window(window_start: str, window_end: str):
+    """Parse "HH:MM" bounds; windows may wrap past midnight (e.g. 20:00-02:00)."""
+    start = datetime.strptime(window_start, "%H:%M").time()
+    end = datetime.strptime(window_end, "%H:%M").time()
+    if start == end:
+        raise ValueError("Calling window start and end must differ")
+    return start, end
+
+def window_minutes(start: dt_time, end: dt_time) -> int:
+    minutes = (end.hour * 60 + end.minute) - (start.hour * 60 + start.minute)
+    return minutes if minutes > 0 else minutes + 24 * 60
+
+def next_window_opening(local_time: datetime, start: dt_time, per_day: int) -> datetime:
+    """Opening (naive wall clock) of the window that contains `local_time`, or else the next one."""
+    opening = local_time.replace(hour=start.hour, minute=start.minute, second=0, microsecond=0)
+    if opening > local_time:
+        # Before today's window, or still inside yesterday's window that wraps past midnight
+        previous = opening - pd.Timedelta(days=1)
+        if local_time < previous + pd.Timedelta(minutes=per_day):
+            opening = previous
+    elif local_time >= opening + pd.Timedelta(minutes=per_day):
+        opening = opening + pd.Timedelta(days=1)
+    return opening
+
+#-------------------------Release-Times------------------------------#
+def assign_release_times(contacts: pd.DataFrame, scheduled_time: datetime, window_start: str, window_end: str,
+                         default_timezone: str = None, timezone_column: str = None,
+                         calls_per_minute: int = None) -> pd.Series:
+    """Spread contacts over the daily calling window of their timezone.
+
+    Contacts are released one every 1/rate minutes from the first window
+    opening at or after `scheduled_time`, rolling into the next day's window
+    when the current one is full. The target rate is shared evenly between
+    timezones. Returns naive server-local datetimes (the same convention as
+    scheduledTime) aligned with the frame's index.
+    """
+    start, end = parse_window(window_start, window_end)
+    per_day = window_minutes(start, end)
+    rate = float(calls_per_minute or DEFAULT_CALLS_PER_MINUTE)
+
+    if timezone_column and timezone_column in contacts.columns:
+        zones = contacts[timezone_column].astype("string").fillna(default_timezone or "").str.strip()
+    else:
+        zones = pd.Series(default_timezone or "", index=contacts.index, dtype="string")
+    groups = zones.groupby(zones, sort=False).groups
+    group_rate = rate / max(len(groups), 1)
+    server_zone = server_timezone()
+    release_at = pd.Series(pd.NaT, index=contacts.index, dtype="datetime64[ns]")
+
+    for zone_name, index in groups.items():
+        zone = ZoneInfo(zone_name) if zone_name else server_zone
+        # Work in the contact's wall-clock time so each day's window opens at the same local hour across DST
+        local_start = local_wall_clock(scheduled_time, zone, server_zone)
+        opening = next_window_opening(local_start, start, per_day)
+        first_offset = max((local_start - opening).total_seconds() / 60, 0)
+
+        # Minutes into the (concatenated) window timeline for each contact
+        offsets = first_offset + np.arange(len(index)) / group_rate
+        days = np.floor(offsets / per_day)
+        minutes = offsets - days * per_day
+        wall_clock = pd.DatetimeIndex(pd.Timestamp(opening) + pd.to_timedelta(days, unit="D") + pd.to_timedelta(minutes, unit="m"))
+        release_at.loc[index] = to_server_time(wall_clock, zone, server_zone)
+
+    logg_obj.Info_Log(
+        f"Spread {len(contacts)} contacts over {len(groups)} timezone(s), window {window_start}-{window_end}, "
+        f"{rate} calls/min, last release {release_at.max()}"
+    )
+    return release_at
+
+#-------------------------Window-Alignment---------------------------#
+def align_to_window(times: pd.Series, zones: pd.Series, window_start: str, window_end: str) -> pd.Series:
+    """Move naive server-local times that fall outside their zone's daily window to its next opening.
+
+    Times already inside the window are returned unchanged, so aligning twice
+    is harmless. `zones` holds IANA names; empty means the server's zone.
+    """
+    start, end = parse_window(window_start, window_end)
+    per_day = pd.Timedelta(minutes=window_minutes(start, end))
+    start_offset = pd.Timedelta(hours=start.hour, minutes=start.minute)
+    day = pd.Timedelta(days=1)
+    server_zone = server_timezone()
+    zones = zones.astype("string").fillna("").str.strip()
+    aligned = pd.Series(pd.to_datetime(times), index=times.index, dtype="datetime64[ns]")
+
+    for zone_name, index in zones.groupby(zones, sort=False).groups.items():
+        zone = ZoneInfo(zone_name) if zone_name else server_zone
+        server_times = pd.DatetimeIndex(aligned.loc[index])
+        local = server_times.tz_localize(server_zone, ambiguous=np.ones(len(index), dtype=bool), nonexistent="shift_forward")
+        local = local.tz_convert(zone).tz_localize(None)
+        opening = local.normalize() + start_offset
+        # Still inside yesterday's window when it wraps past midnight
+        opening = opening.where(~((opening > local) & (local < opening - day + per_day)), opening - day)
+        opening = opening.where(~((opening <= local) & (local >= opening + per_day)), opening + day)
+        inside = (opening <= local) & (local < opening + per_day)
+        moved = to_server_time(pd.DatetimeIndex(opening), zone, server_zone)
+        aligned.loc[index] = np.where(inside, server_times.values, moved)
+    return aligned
@@ -0,0 +1,107 @@
+import os
+import io
+from functools import lru_cache
+from datetime import datetime
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.database.mongodb import db
+from src.database.bulk_writer import BulkWriter
+from src.logger.log import Log_class
+from src.dialer.batch_state import PENDING, ensure_indexes
+
+logg_obj = Log_class("logs", "columnar_batch.txt")
+
+# Batch storage formats: one document per contact, or a Parquet file plus small state documents
+DOCUMENTS = "documents"
+COLUMNAR = "columnar"
+STORAGE_FORMATS = (DOCUMENTS, COLUMNAR)
+DEFAULT_STORAGE_FORMAT = os.getenv("CALL_BATCH_STORAGE", DOCUMENTS)
+# Parquet files of running batches kept open in each process.
+BATCH_TABLE_CACHE_SIZE = int(os.getenv("BATCH_TABLE_CACHE_SIZE", 8))
+
+#--------------------------Arrow-Conversion--------------------------#
+def column_array(column: pd.Series) -> pa.Array:
+    try:
+        return pa.array(column, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed values (e.g. numbers and text from a JSON upload) are stored as text
+        return pa.array(column.map(lambda value: None if pd.isna(value) else str(value)), type=pa.string())
+
+def frame_to_table(df: pd.DataFrame) -> pa.Table:
+    return pa.table({str(name): column_array(df[name]) for name in df.columns})
+
+#---------------------------Store-Batch------------------------------#
+def store_columnar_batch(user_id: str, batch_name: str, contacts_df: pd.DataFrame, templates: pd.Series,
+                         header: dict, phone_column: str = None, release_times=None, on_progress=None):
+    """Write a batch as one Parquet file plus a small state document per contact.
+
+    The contact columns and rendered templates go to GridFS; the values shared
+    by every contact go to the header on the batch's call_batch_runs document.
+    Returns the BulkWriter used for the state documents.
+    """
+    ensure_indexes()
+    table = frame_to_table(contacts_df).append_column("template", pa.array(templates.to_numpy(dtype=object), type=pa.string()))
+    sink = io.BytesIO()
+    pq.write_table(table, sink, compression="zstd")
+    file_id = db.store_file(sink.getvalue(), f"{batch_name}.parquet", metadata={
+        "file_type": "parquet",
+        "purpose": "call_batch",
+        "uploaded_by": user_id,
+        "batch_name": batch_name,
+        "uploaded_at": datetime.utcnow(),
+    })
+    storage = {**header, "format": COLUMNAR, "file_id": file_id, "rows": table.num_rows}
+    if release_times is not None and len(release_times):
+        storage["first_release"] = min(release_times)
+        storage["last_release"] = max(release_times)
+    db.call_batch_runs.update_one(
+        {"created_by": user_id, "batch_name": batch_name}, {"$set": {"storage": storage}}, upsert=True
+    )
+
+    phones = contacts_df[phone_column].to_numpy(dtype=object) if phone_column else None
+    with BulkWriter(db.call_batch_details, on_progress=on_progress) as writer:
+        for row in range(table.num_rows):
+            state = {"created_by": user_id, "batch_name": batch_name, "row": row, "dispatch_status": PENDING}
+            if phones is not None:
+                # Kept on the state document for suppression and opt-out lookups
+                state["phone"] = phones[row]
+            if release_times is not None:
+                state["release_at"] = release_times[row]
+            writer.add(state)
+            if writer.errors:
+                break
+    logg_obj.Info_Log(f"{batch_name}: stored {table.num_rows} contacts as Parquet ({len(sink.getvalue())} bytes)")
+    return writer
+
+def delete_columnar_batch(user_id: str, batch_name: str):
+    run = db.call_batch_runs.find_one({"created_by": user_id, "batch_name": batch_name}, {"storage": 1}) or {}
+    storage = run.get("storage")
+    if storage and storage.get("file_id"):
+        db.delete_file(storage["file_id"])
+        db.call_batch_runs.update_one({"created_by": user_id, "batch_name": batch_name}, {"$unset": {"storage": ""}})
+
+#----------------------------Read-Batch------------------------------#
+def get_batch_storage(user_id: str, batch_name: str):
+    """The columnar header of a batch, or None for a batch stored as full documents."""
+    run = db.call_batch_runs.find_one({"created_by": user_id, "batch_name": batch_name}, {"storage": 1}) or {}
+    storage = run.get("storage")
+    return storage if storage and storage.get("format") == COLUMNAR else None
+
+@lru_cache(maxsize=BATCH_TABLE_CACHE_SIZE)
+def load_batch_table(file_id: str) -> pa.Table:
+    # Batch files never change once written, so the parsed table can be reused for the whole run
+    data, _ = db.get_file(file_id)
+    return pq.read_table(pa.BufferReader(data))
+
+def hydrate_contacts(storage: dict, contacts: list, fields) -> list:
+    """Fill state documents with the requested columns of their Parquet rows."""
+    if not contacts:
+        return contacts
+    table = load_batch_table(storage["file_id"])
+    columns = [field for field in fields if field in table.column_names]
+    rows = table.select(columns).take(pa.array([contact["row"] for contact in contacts], type=pa.int64()))
+    for contact, values in zip(contacts, rows.to_pylist()):
+        for field, value in values.items():
+            contact.setdefault(field, value)
+    return contacts
@@ -0,0 +1,227 @@
+import os
+import asyncio
+from itertools import islice
+from src.logger.log import Log_class
+from src.user_utils.utils import trigger_outbound_call
+from src.dialer.livekit_client import livekit_client
+from src.user_utils.phone_numbers import PHONE_FIELDS
+from src.dialer.rate_limiter import is_rate_limited_error
+from src.dialer.fair_queue import fair_queue
+from src.dialer.redial import schedule_redials
+from src.dialer.suppression import suppression_index
+from src.dialer.columnar_batch import get_batch_storage, hydrate_contacts
+from src.dialer.batch_state import DISPATCHED, FAILED, SKIPPED, HEARTBEAT_INTERVAL_SECONDS
+
+logg_obj = Log_class("logs", "dialer_engine.txt")
+
+# Maximum number of agent dispatches in flight at the same time.
+DEFAULT_CONCURRENCY = int(os.getenv("DIALER_CONCURRENCY", 50))
+# Only the fields the dialer needs are loaded for each contact; "row" locates it in a columnar batch.
+CONTACT_PROJECTION = {"template": 1, "row": 1, **{field: 1 for field in PHONE_FIELDS}}
+# Number of failure samples kept in the summary.
+MAX_ERROR_SAMPLES = 20
+# Retries for dispatches the trunk rejected for capacity, and the base backoff in seconds.
+DISPATCH_MAX_RETRIES = int(os.getenv("DISPATCH_MAX_RETRIES", 5))
+DISPATCH_RETRY_BACKOFF = float(os.getenv("DISPATCH_RETRY_BACKOFF", 1))
+# Contacts pulled from the source (e.g. a Mongo cursor) per blocking fetch.
+FETCH_CHUNK_SIZE = 500
+
+#-----------------------Contact-Phone-Number-------------------------#
+def get_contact_phone(contact: dict):
+    for field in PHONE_FIELDS:
+        value = contact.get(field)
+        if value is not None and str(value).strip() not in ("", "nan"):
+            return str(value).strip()
+    return None
+
+#---------------------------Dialer-Engine----------------------------#
+class DialerEngine:
+    """Fan a call batch out to one LiveKit agent dispatch per contact."""
+
+    def __init__(self, outbound_trunk_id, system_prompt, concurrency=DEFAULT_CONCURRENCY, rate_limiter=None,
+                 tenant=None, tenant_limits=None):
+        self.outbound_trunk_id = outbound_trunk_id
+        self.system_prompt = system_prompt
+        self.concurrency = max(1, int(concurrency))
+        # Token bucket pacing dispatches to the trunk's calls-per-second limit
+        self.rate_limiter = rate_limiter
+        # Dispatches share the process-wide fair-share queue under this tenant (created_by)
+        self.tenant = tenant
+        self.tenant_limits = tenant_limits or {}
+
+    @staticmethod
+    def new_summary():
+        return {"total": 0, DISPATCHED: 0, FAILED: 0, SKIPPED: 0, "errors": []}
+
+    def record(self, summary, contact, status, error=None):
+        summary[status] += 1
+        if error and len(summary["errors"]) < MAX_ERROR_SAMPLES:
+            summary["errors"].append({"contact_id": str(contact.get("_id")), "error": error})
+
+    def screen(self, chunk, batch_name=None) -> dict:
+        """Positions in `chunk` of contacts the tenant must not dial now, mapped to the reason."""
+        if self.tenant is None or not chunk:
+            return {}
+        reasons = suppression_index.check(self.tenant, [get_contact_phone(contact) for contact in chunk], batch_name)
+        return {index: reason for index, reason in enumerate(reasons) if reason is not None}
+
+    async def dispatch_contact(self, livekit_api, contact):
+        """Dispatch a single contact and return (status, error, room_name)."""
+        phone_number = get_contact_phone(contact)
+        if not phone_number:
+            return SKIPPED, "No phone number found for contact", None
+        attempt = 0
+        while True:
+            async def dispatch():
+                # Take the trunk token only once the fair-queue slot is granted, so tokens
+                # are not spent by contacts still waiting and then released in one burst
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.acquire()
+                return await trigger_outbound_call(
+                    outbound_trunk_id=self.outbound_trunk_id,
+                    system_prompt=f"{self.system_prompt} {contact.get('template', '')}".strip(),
+                    phone_number=phone_number,
+                    livekit_api=livekit_api,
+                    metadata={"contact_id": str(contact.get("_id"))},
+                )
+            try:
+                if self.tenant is not None:
+                    room_name = await fair_queue.run(self.tenant, dispatch)
+                else:
+                    room_name = await dispatch()
+                return DISPATCHED, None, room_name
+            except Exception as e:
+                # Capacity rejections go back in the queue instead of failing the contact
+                if is_rate_limited_error(e) and attempt < DISPATCH_MAX_RETRIES:
+                    delay = DISPATCH_RETRY_BACKOFF * (2 ** attempt)
+                    attempt += 1
+                    logg_obj.Info_Log(f"Trunk rejected contact {contact.get('_id')} ({str(e)}), retrying in {delay}s")
+                    if self.rate_limiter is not None:
+                        self.rate_limiter.penalize(delay)
+                    else:
+                        await asyncio.sleep(delay)
+                    continue
+                logg_obj.Error_Log(f"Dispatch failed for contact {contact.get('_id')}: {str(e)}")
+                return FAILED, str(e), None
+
+    async def run(self, contacts=None, checkpoint=None):
+        """Dispatch contacts with at most `concurrency` dispatches in flight.
+
+        With a BatchCheckpoint the engine pulls pending contacts itself, marks
+        each chunk in flight before queueing it and writes results back in
+        bulk, so an interrupted run can be resumed.
+        """
+        summary = self.new_summary()
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        livekit_api = await livekit_client.get_api()
+        results = []
+        # Claimed contacts left undialed because the run or lease was lost
+        unsent = []
+        if contacts is not None:
+            contacts = iter(contacts)
+        storage = None
+        if checkpoint is not None:
+            storage = await asyncio.to_thread(get_batch_storage, checkpoint.user_id, checkpoint.batch_name)
+
+        def lost():
+            return checkpoint is not None and checkpoint.lost.is_set()
+
+        def next_chunk():
+            if checkpoint is not None:
+                chunk = checkpoint.next_chunk(CONTACT_PROJECTION, FETCH_CHUNK_SIZE)
+                if storage is not None:
+                    # Columnar batches keep the template and contact fields in the batch's Parquet file
+                    chunk = hydrate_contacts(storage, chunk, CONTACT_PROJECTION)
+            else:
+                chunk = list(islice(contacts, FETCH_CHUNK_SIZE))
+            return chunk, self.screen(chunk, checkpoint.batch_name if checkpoint is not None else None)
+
+        async def flush(force=False):
+            nonlocal results
+            if checkpoint is not None and results and (force or len(results) >= FETCH_CHUNK_SIZE):
+                pending, results = results, []
+                await asyncio.to_thread(checkpoint.flush, pending)
+
+        async def heartbeat():
+            while True:
+                await asyncio.sleep(HEARTBEAT_INTERVAL_SECONDS)
+                await asyncio.to_thread(checkpoint.heartbeat)
+
+        async def worker():
+            while True:
+                contact = await queue.get()
+                try:
+                    if contact is None:
+                        return
+                    if lost():
+                        summary["total"] -= 1
+                        unsent.append(contact["_id"])
+                        continue
+                    status, error, room_name = await self.dispatch_contact(livekit_api, contact)
+                    self.record(summary, contact, status, error)
+                    results.append((contact["_id"], status, error, room_name))
+                    await flush()
+                finally:
+                    queue.task_done()
+
+        if self.tenant is not None:
+            fair_queue.configure_tenant(self.tenant, **self.tenant_limits)
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        heartbeat_task = asyncio.create_task(heartbeat()) if checkpoint is not None else None
+        state = "failed"
+        try:
+            while not lost():
+                # Mongo reads and writes block, so keep them off the event loop
+                chunk, suppressed = await asyncio.to_thread(next_chunk)
+                if not chunk:
+                    break
+                for index, contact in enumerate(chunk):
+                    if lost():
+                        unsent.extend(remaining["_id"] for remaining in chunk[index:])
+                        break
+                    summary["total"] += 1
+                    if index in suppressed:
+                        # Opted out or reached by another batch since the batch was created
+                        error = f"Suppressed: {suppressed[index]}"
+                        self.record(summary, contact, SKIPPED, error)
+                        results.append((contact["_id"], SKIPPED, error, None))
+                        continue
+                    await queue.put(contact)
+            # Another owner resumes a lost run; it must not be completed or redialed from here
+            state = "lost" if lost() else "completed"
+        finally:
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+            if heartbeat_task is not None:
+                heartbeat_task.cancel()
+            if self.tenant is not None:
+                fair_queue.release_tenant(self.tenant)
+            await flush(force=True)
+            if checkpoint is not None and unsent:
+                await asyncio.to_thread(checkpoint.release, unsent)
+            if checkpoint is not None:
+                await asyncio.to_thread(checkpoint.finish, summary, state)
+                if state == "completed":
+                    # Failed contacts go back in the queue after their backoff
+                    await asyncio.to_thread(schedule_redials, checkpoint.user_id, checkpoint.batch_name)
+
+        logg_obj.Info_Log(
+            f"Batch dispatch finished: total={summary['total']} dispatched={summary[DISPATCHED]} "
+            f"failed={summary[FAILED]} skipped={summary[SKIPPED]}"
+        )
+        return summary
+
+    def run_sync(self, contacts=None, checkpoint=None):
+        """Block the calling thread until the batch has been dispatched on the shared loop."""
+        return livekit_client.run(self.run(contacts, checkpoint))
+
+    def start_in_background(self, contacts=None, checkpoint=None):
+        """Schedule the batch on the shared loop so the calling Flask worker returns immediately."""
+        future = livekit_client.submit(self.run(contacts, checkpoint))
+        future.add_done_callback(self.log_failure)
+        return future
+
+    def log_failure(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            logg_obj.Error_Log(f"Batch dispatch aborted: {str(future.exception())}")
@@ -0,0 +1,144 @@
+import os
+import asyncio
+from collections import deque
+from src.database.mongodb import db
+from src.logger.log import Log_class
+
+logg_obj = Log_class("logs", "fair_queue.txt")
+
+# Dispatch slots shared by every tenant in this process.
+FAIR_QUEUE_CONCURRENCY = int(os.getenv("FAIR_QUEUE_CONCURRENCY", 100))
+# Per-tenant defaults when neither the user nor the telephony record sets them.
+DEFAULT_TENANT_WEIGHT = int(os.getenv("DEFAULT_TENANT_WEIGHT", 1))
+DEFAULT_TENANT_CONCURRENCY = int(os.getenv("DEFAULT_TENANT_CONCURRENCY", 25))
+
+class Tenant:
+    def __init__(self, name, weight, max_concurrent):
+        self.name = name
+        self.weight = max(int(weight), 1)
+        self.max_concurrent = max(int(max_concurrent), 1)
+        self.waiting = deque()
+        self.in_flight = 0
+        self.batches = 0
+
+    def ready(self) -> bool:
+        return bool(self.waiting) and self.in_flight < self.max_concurrent
+
+#--------------------------Fair-Share-Queue--------------------------#
+class FairShareQueue:
+    """Weighted round-robin over tenants (created_by) feeding shared dispatch slots.
+
+    Each tenant may take up to `weight` slots per turn and never holds more
+    than its own concurrency cap, so a 200k-contact batch cannot starve a
+    small campaign queued behind it. Must be used from the shared
+    background loop.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(FairShareQueue, cls).__new__(cls)
+            cls._instance._setup(FAIR_QUEUE_CONCURRENCY)
+        return cls._instance
+
+    def _setup(self, max_concurrency):
+        self.max_concurrency = max(int(max_concurrency), 1)
+        self.in_flight = 0
+        self.tenants = {}
+        self.ring = deque()
+        self.credit = 0
+
+    def configure_tenant(self, name, weight=None, max_concurrent=None):
+        """Register a batch for a tenant; pair with release_tenant when the batch ends."""
+        weight = weight or DEFAULT_TENANT_WEIGHT
+        max_concurrent = max_concurrent or DEFAULT_TENANT_CONCURRENCY
+        tenant = self.tenants.get(name)
+        if tenant is None:
+            tenant = Tenant(name, weight, max_concurrent)
+            self.tenants[name] = tenant
+            self.ring.append(name)
+        else:
+            tenant.weight = max(int(weight), 1)
+            tenant.max_concurrent = max(int(max_concurrent), 1)
+        tenant.batches += 1
+        return tenant
+
+    def release_tenant(self, name):
+        tenant = self.tenants.get(name)
+        if tenant is None:
+            return
+        tenant.batches -= 1
+        # Drop tenants with no running batch so the ring only holds active ones
+        if tenant.batches <= 0 and not tenant.waiting and tenant.in_flight == 0:
+            if self.ring and self.ring[0] == name:
+                self.credit = 0
+            del self.tenants[name]
+            self.ring.remove(name)
+
+    async def run(self, tenant_name, coro_factory):
+        """Queue `coro_factory()` behind the tenant's fair share and return its result."""
+        tenant = self.tenants.get(tenant_name)
+        if tenant is None:
+            raise RuntimeError(f"Tenant {tenant_name} is not registered with the dispatch queue")
+        future = asyncio.get_running_loop().create_future()
+        tenant.waiting.append((coro_factory, future))
+        self._schedule()
+        return await future
+
+    def _next_tenant(self):
+        # Weighted round robin: the head of the ring keeps its turn for `weight` picks
+        if not self.ring:
+            return None
+        for _ in range(len(self.ring) + 1):
+            tenant = self.tenants[self.ring[0]]
+            if self.credit > 0 and tenant.ready():
+                self.credit -= 1
+                return tenant
+            self.ring.rotate(-1)
+            self.credit = self.tenants[self.ring[0]].weight
+        return None
+
+    def _schedule(self):
+        while self.in_flight < self.max_concurrency:
+            tenant = self._next_tenant()
+            if tenant is None:
+                return
+            coro_factory, future = tenant.waiting.popleft()
+            if future.cancelled():
+                continue
+            tenant.in_flight += 1
+            self.in_flight += 1
+            task = asyncio.ensure_future(coro_factory())
+            task.add_done_callback(lambda done, tenant=tenant, future=future: self._finish(tenant, future, done))
+
+    def _finish(self, tenant, future, task):
+        tenant.in_flight -= 1
+        self.in_flight -= 1
+        if not future.cancelled():
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+        self._schedule()
+
+    def stats(self):
+        return {
+            name: {"waiting": len(tenant.waiting), "in_flight": tenant.in_flight, "batches": tenant.batches,
+                   "weight": tenant.weight, "max_concurrent": tenant.max_concurrent}
+            for name, tenant in self.tenants.items()
+        }
+
+#---------------------------Tenant-Limits----------------------------#
+def get_tenant_limits(user_id: str, telephony_details: dict = None) -> dict:
+    """Weight and concurrency cap for a tenant; the telephony record overrides the user record."""
+    telephony_details = telephony_details or {}
+    user = db.users.find_one({"user_id": user_id}, {"_id": 0, "dispatchWeight": 1, "maxConcurrentCalls": 1}) or {}
+    return {
+        "weight": telephony_details.get("dispatchWeight") or user.get("dispatchWeight"),
+        "max_concurrent": telephony_details.get("maxConcurrentCalls") or user.get("maxConcurrentCalls"),
+    }
+
+# Create a singleton instance
+fair_queue = FairShareQueue()
@@ -0,0 +1,234 @@
+import os
+from cryptography.fernet import Fernet
+from dotenv import load_dotenv
+from twilio.rest import Client
+from src.database.mongodb import db
+from src.logger.log import Log_class
+from src.user_utils.utils import get_lk_outbound_sip
+from src.dialer.engine import DialerEngine
+from src.dialer.batch_state import BatchCheckpoint
+from src.dialer.lease import publish_batch
+from src.dialer.livekit_client import livekit_client
+from src.dialer.rate_limiter import get_trunk_limiter
+from src.dialer.fair_queue import get_tenant_limits
+
+load_dotenv()
+logg_obj = Log_class("logs", "launcher.txt")
+
+SYSTEM_MESSAGE = """You are an Ayesha working for a financial services provider. Your tone should be friendly, polite, professional, and easy to understand. You are calling customers to remind them of an upcoming or overdue loan payment. Your goal is to inform them clearly, avoid sounding robotic or aggressive, and offer assistance if needed. You should personalize the call with the customer's name, mention the due date and amount, and ask them if they are able to pay it on time or not, If not, trace the reason. If something is out of order, ask them to contact the support team. Always speak slowly, with natural pauses, and sound empathetic and respectful throughout the call. Find the user details as follows:"""
+
+# Get encryption key
+ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY")
+
+# Initialize Fernet with the encryption key
+try:
+    cipher_suite = Fernet(ENCRYPTION_KEY)
+except Exception as e:
+    logg_obj.Error_Log(f"Failed to initialize Fernet: {str(e)}")
+    raise
+
+
+def decrypt_credential(encrypted_credential):
+    """Decrypt a credential using Fernet symmetric encryption"""
+    return cipher_suite.decrypt(encrypted_credential.encode()).decode()
+
+#-----------------------Twilio-Trunk-Provisioning--------------------#
+def provision_twilio_trunk(telephony_details: dict, user_id: str) -> str:
+    """Return the user's LiveKit outbound trunk, creating the Twilio SIP setup on first launch."""
+    account_sid = decrypt_credential(telephony_details["twilioAccountSid"])
+    auth_token = decrypt_credential(telephony_details["twilioAuthToken"])
+    phone_number = telephony_details.get("twilioPhoneNumber")
+
+    client = Client(account_sid, auth_token)
+    # Check if SIP trunk already exists
+    existing_trunk = None
+    if "sip_trunk_sid" in telephony_details:
+        try:
+            existing_trunk = client.trunking.trunks(
+                telephony_details["sip_trunk_sid"]
+            ).fetch()
+        except:
+            pass
+    if not existing_trunk:
+        # Create a unique domain name based on account SID
+        domain_name = f"{account_sid[-8:]}.pstn.twilio.com"
+
+        # Create SIP domain
+        try:
+            domain = client.sip.domains.create(
+                domain_name=domain_name,
+                friendly_name=f"Auto SIP Domain for {user_id}",
+            )
+        except:
+            pass
+        # Create SIP trunk
+        try:
+            trunk = client.trunking.trunks.create(
+                friendly_name=f"Auto SIP Trunk for {user_id}",
+                domain_name=domain_name,
+            )
+            # trunk_sid = trunk.sid
+        except:
+            print(client.trunking.trunks.list())
+
+        # Store trunk SID in database
+        db.telephony_details.update_one(
+            {"user_id": user_id},
+            {
+                "$set": {
+                    "sip_trunk_sid": trunk.sid,
+                    "domain_name": domain_name,
+                }
+            },
+        )
+        # Create Credentials
+        credential_list = client.sip.credential_lists.create(
+                friendly_name=f'{user_id}-Credential-List',
+            )
+        print(f"Created Credential List SID: {credential_list.sid}")
+        # Store Credential List SID in database
+        db.telephony_details.update_one(
+            {"user_id": user_id},
+            {
+                "$set": {
+                    "credential_list_sid": credential_list.sid,
+                }
+            },
+        )
+        auth_password = telephony_details["voiceProvider"] + user_id
+        credential = client.sip.credential_lists(credential_list.sid).credentials.create(
+            username= user_id,
+            password= auth_password
+        )
+        print(f"Created Credential SID: {credential.sid}")
+
+        # Store Credential SID in database
+        db.telephony_details.update_one(
+            {"user_id": user_id},
+            {
+                "$set": {
+                    "credential_sid": credential.sid,
+                    "user_name": user_id,
+                    "password": auth_password
+                }
+            },
+        )
+
+        # Associate Credential List with Trunk's Termination
+        client.trunking.v1.trunks(trunk.sid).credentials_lists \
+            .create(credential_list_sid=credential_list.sid)
+
+        print("Credential List linked to Termination URI")
+
+        # Store Credential List SID in database
+        db.telephony_details.update_one(
+            {"user_id": user_id},
+            {
+                "$set": {
+                    "is_credential_linked": True,
+                }
+            },
+        )
+        print("Credential List linked to Termination URI and added to telephony details")
+
+        # Create Livekit Outbound SIP
+        lk_outbound_sip = livekit_client.run(get_lk_outbound_sip(name=user_id, address=domain_name, numbers=phone_number, user_name=user_id, password=auth_password))
+        # Store Credential List SID in database
+        db.telephony_details.update_one(
+            {"user_id": user_id},
+            {
+                "$set": {
+                    "is_lk_outbound_created": True,
+                    "lk_outbound_sip": lk_outbound_sip
+                }
+            },
+        )
+        print("Created LK Outbound SIP for Twilio and Stored in Telephony Details")
+        return lk_outbound_sip
+
+    # Fetch all details and trigger Call
+    lk_outbound_sip = telephony_details.get('lk_outbound_sip')
+    if not telephony_details.get('is_lk_outbound_created') or not lk_outbound_sip:
+        raise ValueError("No LiveKit outbound trunk found for this user")
+    return lk_outbound_sip
+
+#--------------------------Launch-Call-Batch-------------------------#
+def nothing_due(checkpoint: BatchCheckpoint):
+    if checkpoint.has_pending(released_only=False):
+        return {"status": True, "message": "No contacts in this batch are due in their calling window yet"}, 200
+    return {"status": True, "message": "All contacts in this batch have already been dispatched"}, 200
+
+def launch_call_batch(user_id: str, batch_name: str, wait: bool = False, distributed: bool = False):
+    """Start dispatching a call batch and return (response_body, http_status).
+
+    Used by /launch/execute_call_batch and called directly by the scheduler.
+    """
+    batch_query = {"created_by": user_id, "batch_name": batch_name}
+    if not db.call_batch_details.find_one(batch_query, {"_id": 1}):
+        return {"status": False, "error": "No call batch found with the given name"}, 404
+    # Contacts become visible while the batch is still being stored; dialing them then would
+    # skip the rest of the batch or call contacts of a batch that is about to be discarded
+    run = db.call_batch_runs.find_one(batch_query, {"creation.state": 1}) or {}
+    creation_state = (run.get("creation") or {}).get("state")
+    if creation_state == "creating":
+        return {"status": False, "error": "Call batch is still being created", "retry": True}, 409
+    if creation_state not in (None, "created"):
+        return {"status": False, "error": "Call batch creation failed; create the batch again"}, 409
+
+    # Fetch user's telephony details
+    telephony_details = db.telephony_details.find_one({"user_id": user_id}, {"_id": 0})
+    if not telephony_details:
+        return {"status": False, "error": "No telephony integration found for this user"}, 400
+    if telephony_details["voiceProvider"] != "TWILIO":
+        return {"status": False, "error": f"Unsupported voice provider: {telephony_details['voiceProvider']}"}, 400
+
+    try:
+        lk_outbound_sip = provision_twilio_trunk(telephony_details, user_id)
+    except ValueError as e:
+        return {"status": False, "error": str(e)}, 400
+    telephony_details["lk_outbound_sip"] = lk_outbound_sip
+
+    # Only one live run per batch; a re-trigger while it runs is a no-op
+    checkpoint = BatchCheckpoint(user_id, batch_name)
+    config = None
+    if distributed:
+        config = {
+            "outbound_trunk_id": lk_outbound_sip,
+            "system_prompt": SYSTEM_MESSAGE,
+            "lk_outbound_sip": lk_outbound_sip,
+            "callsPerSecond": telephony_details.get("callsPerSecond"),
+            "callsPerSecondBurst": telephony_details.get("callsPerSecondBurst"),
+            "tenant_limits": get_tenant_limits(user_id, telephony_details),
+        }
+    # Nothing to do: answer without acquiring, which would replace the last run's summary with an empty one
+    if not checkpoint.has_pending() and not checkpoint.has_in_flight():
+        return nothing_due(checkpoint)
+    if not checkpoint.acquire(config):
+        return {"status": True, "message": "Call batch is already running"}, 200
+    try:
+        checkpoint.recover()
+        if not checkpoint.has_pending():
+            checkpoint.finish(DialerEngine.new_summary())
+            return nothing_due(checkpoint)
+
+        # Dispatch workers claim the contacts in lease-sized chunks
+        if distributed:
+            chunks = publish_batch(checkpoint)
+            return {"status": True, "message": f"Call batch published to dispatch workers in {chunks} chunks"}, 202
+
+        # Fan the remaining contacts out to one agent dispatch each
+        engine = DialerEngine(
+            outbound_trunk_id=lk_outbound_sip,
+            system_prompt=SYSTEM_MESSAGE,
+            rate_limiter=get_trunk_limiter(telephony_details),
+            tenant=user_id,
+            tenant_limits=get_tenant_limits(user_id, telephony_details),
+        )
+        if wait:
+            summary = engine.run_sync(checkpoint=checkpoint)
+            return {"status": True, "summary": summary}, 200
+        engine.start_in_background(checkpoint=checkpoint)
+        return {"status": True, "message": "Call batch dispatch started"}, 202
+    except Exception:
+        checkpoint.finish(DialerEngine.new_summary(), state="failed")
+        raise
@@ -0,0 +1,206 @@
+import os
+import time
+import socket
+import threading
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from src.database.mongodb import db
+from src.logger.log import Log_class
+from src.dialer.batch_state import BatchCheckpoint, ensure_indexes, pending_filter
+from src.dialer.engine import DialerEngine, DEFAULT_CONCURRENCY
+from src.dialer.rate_limiter import get_trunk_limiter
+
+logg_obj = Log_class("logs", "dispatch_worker.txt")
+
+# Contacts per lease document claimed by a worker.
+LEASE_CHUNK_SIZE = int(os.getenv("LEASE_CHUNK_SIZE", 500))
+# A lease not renewed within this window is handed to another worker.
+LEASE_TTL_SECONDS = int(os.getenv("LEASE_TTL_SECONDS", 120))
+# Seconds an idle worker waits before polling for work again.
+WORKER_POLL_SECONDS = float(os.getenv("WORKER_POLL_SECONDS", 2))
+# Chunks one worker process dispatches at the same time.
+WORKER_PARALLEL_CHUNKS = int(os.getenv("WORKER_PARALLEL_CHUNKS", 2))
+# Worker processes sharing each trunk; its CPS limit is split between them.
+DISPATCH_WORKERS = int(os.getenv("DISPATCH_WORKERS", 1))
+# Claims of one lease before it is parked as failed.
+LEASE_MAX_ATTEMPTS = int(os.getenv("LEASE_MAX_ATTEMPTS", 5))
+# Seconds a failed lease waits before it can be claimed again; doubles with each attempt.
+LEASE_RETRY_SECONDS = float(os.getenv("LEASE_RETRY_SECONDS", 30))
+
+_indexes_ready = False
+
+def ensure_lease_indexes():
+    global _indexes_ready
+    if not _indexes_ready:
+        ensure_indexes()
+        db.call_batch_leases.create_index([("state", 1), ("lease_expires_at", 1), ("created_at", 1)])
+        db.call_batch_leases.create_index([("created_by", 1), ("batch_name", 1), ("state", 1)])
+        _indexes_ready = True
+
+#---------------------------Publish-Batch----------------------------#
+def publish_batch(checkpoint: BatchCheckpoint) -> int:
+    """Split a batch's pending contacts into lease documents for dispatch workers."""
+    ensure_lease_indexes()
+    batch_query = checkpoint.batch_query
+    # Leases left over from a crashed run are rebuilt from the pending contacts
+    db.call_batch_leases.delete_many({**batch_query, "state": {"$ne": "done"}})
+    cursor = db.call_batch_details.find({**batch_query, **pending_filter(datetime.now())}, {"_id": 1}).sort("_id", 1)
+    now = datetime.utcnow()
+    chunk_no, contact_ids, leases = 0, [], []
+    for contact in cursor:
+        contact_ids.append(contact["_id"])
+        if len(contact_ids) == LEASE_CHUNK_SIZE:
+            leases.append(new_lease(checkpoint, chunk_no, contact_ids, now))
+            chunk_no, contact_ids = chunk_no + 1, []
+    if contact_ids:
+        leases.append(new_lease(checkpoint, chunk_no, contact_ids, now))
+    if leases:
+        db.call_batch_leases.insert_many(leases, ordered=False)
+    logg_obj.Info_Log(f"{checkpoint.batch_name}: published {len(leases)} lease chunks")
+    return len(leases)
+
+def new_lease(checkpoint, chunk_no, contact_ids, now):
+    return {
+        **checkpoint.batch_query,
+        "run_id": checkpoint.run_id,
+        "chunk_no": chunk_no,
+        "contact_ids": contact_ids,
+        "state": "open",
+        "owner": None,
+        "lease_expires_at": None,
+        "attempts": 0,
+        "not_before": None,
+        "created_at": now,
+    }
+
+#----------------------------Claim-Lease-----------------------------#
+def claim_lease(worker_id: str):
+    """Atomically take the oldest open or expired lease, or None when there is no work."""
+    now = datetime.utcnow()
+    # Leases whose last allowed attempt died with its worker are parked instead of retried forever
+    db.call_batch_leases.update_many(
+        {"state": "leased", "lease_expires_at": {"$lt": now}, "attempts": {"$gte": LEASE_MAX_ATTEMPTS}},
+        {"$set": {"state": "failed", "owner": None, "finished_at": now}},
+    )
+    return db.call_batch_leases.find_one_and_update(
+        {
+            "attempts": {"$lt": LEASE_MAX_ATTEMPTS},
+            "$or": [
+                {"state": "open", "$or": [{"not_before": None}, {"not_before": {"$lte": now}}]},
+                {"state": "leased", "lease_expires_at": {"$lt": now}},
+            ],
+        },
+        {
+            "$set": {"state": "leased", "owner": worker_id, "lease_expires_at": now + timedelta(seconds=LEASE_TTL_SECONDS)},
+            "$inc": {"attempts": 1},
+        },
+        sort=[("created_at", 1), ("chunk_no", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+class LeaseCheckpoint(BatchCheckpoint):
+    """BatchCheckpoint scoped to the contacts of one claimed lease."""
+
+    def __init__(self, lease: dict, worker_id: str):
+        super().__init__(lease["created_by"], lease["batch_name"])
+        self.run_id = lease["run_id"]
+        self.lease_id = lease["_id"]
+        self.attempts = lease.get("attempts", 1)
+        self.worker_id = worker_id
+        self.batch_query = {**self.batch_query, "_id": {"$in": lease["contact_ids"]}}
+
+    def heartbeat(self):
+        now = datetime.utcnow()
+        renewed = db.call_batch_leases.update_one(
+            {"_id": self.lease_id, "owner": self.worker_id, "state": "leased"},
+            {"$set": {"lease_expires_at": now + timedelta(seconds=LEASE_TTL_SECONDS)}},
+        )
+        if not renewed.matched_count:
+            logg_obj.Error_Log(f"{self.batch_name}: lease {self.lease_id} was lost by {self.worker_id}")
+            self.lost.set()
+        db.call_batch_runs.update_one({"run_id": self.run_id}, {"$set": {"heartbeat_at": now}})
+
+    def finish(self, summary: dict, state: str = "completed"):
+        now = datetime.utcnow()
+        lease_update = {"state": "done", "owner": None, "finished_at": now}
+        if state != "completed":
+            if self.attempts >= LEASE_MAX_ATTEMPTS:
+                # Out of attempts: parked until the batch is launched again
+                lease_update["state"] = "failed"
+                logg_obj.Error_Log(f"{self.batch_name}: lease {self.lease_id} failed {self.attempts} times, parked")
+            else:
+                # Released so another worker can resume it after a growing delay
+                lease_update["state"] = "open"
+                lease_update["not_before"] = now + timedelta(seconds=LEASE_RETRY_SECONDS * 2 ** (self.attempts - 1))
+        db.call_batch_leases.update_one({"_id": self.lease_id, "owner": self.worker_id}, {"$set": lease_update})
+        counts = {f"summary.{key}": value for key, value in summary.items() if key != "errors"}
+        db.call_batch_runs.update_one(
+            {"run_id": self.run_id},
+            {"$inc": counts, "$set": {"heartbeat_at": datetime.utcnow()}},
+        )
+        lease_query = {"created_by": self.user_id, "batch_name": self.batch_name}
+        remaining = db.call_batch_leases.find_one({**lease_query, "state": {"$nin": ["done", "failed"]}}, {"_id": 1})
+        if remaining is None:
+            failed = db.call_batch_leases.find_one({**lease_query, "state": "failed"}, {"_id": 1})
+            db.call_batch_runs.update_one(
+                {"run_id": self.run_id, "state": "running"},
+                {"$set": {"state": "failed" if failed else "completed", "finished_at": datetime.utcnow()}},
+            )
+            logg_obj.Info_Log(f"{self.batch_name}: all lease chunks finished{' with failures' if failed else ''}")
+
+#---------------------------Dispatch-Worker--------------------------#
+class DispatchWorker:
+    """Claims lease chunks from any published batch and dispatches them."""
+
+    def __init__(self, worker_id: str = None, parallel_chunks: int = WORKER_PARALLEL_CHUNKS):
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.parallel_chunks = max(1, int(parallel_chunks))
+        self.stop_event = threading.Event()
+
+    def run_lease(self, lease: dict):
+        checkpoint = LeaseCheckpoint(lease, self.worker_id)
+        run = db.call_batch_runs.find_one({"run_id": lease["run_id"]}, {"config": 1})
+        if not run or not run.get("config"):
+            logg_obj.Error_Log(f"{lease['batch_name']}: no dispatch config for run {lease['run_id']}")
+            checkpoint.finish(DialerEngine.new_summary(), state="failed")
+            return
+        config = run["config"]
+        if lease["attempts"] > 1:
+            checkpoint.recover()
+        engine = DialerEngine(
+            outbound_trunk_id=config["outbound_trunk_id"],
+            system_prompt=config["system_prompt"],
+            concurrency=config.get("concurrency", DEFAULT_CONCURRENCY),
+            rate_limiter=get_trunk_limiter(config, share=DISPATCH_WORKERS),
+            tenant=lease["created_by"],
+            tenant_limits=config.get("tenant_limits"),
+        )
+        summary = engine.run_sync(checkpoint=checkpoint)
+        logg_obj.Info_Log(f"{self.worker_id}: chunk {lease['chunk_no']} of {lease['batch_name']} done: {summary}")
+
+    def claim_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                lease = claim_lease(self.worker_id)
+                if lease is None:
+                    self.stop_event.wait(WORKER_POLL_SECONDS)
+                    continue
+                self.run_lease(lease)
+            except Exception as e:
+                logg_obj.Error_Log(f"{self.worker_id}: {str(e)}")
+                self.stop_event.wait(WORKER_POLL_SECONDS)
+
+    def run(self):
+        ensure_lease_indexes()
+        logg_obj.Info_Log(f"Dispatch worker {self.worker_id} started with {self.parallel_chunks} slots")
+        threads = [threading.Thread(target=self.claim_loop, daemon=True) for _ in range(self.parallel_chunks)]
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                time.sleep(1)
+        except (KeyboardInterrupt, SystemExit):
+            self.stop()
+
+    def stop(self):
+        self.stop_event.set()
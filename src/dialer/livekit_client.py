@@ -0,0 +1,71 @@
+import os
+import atexit
+import asyncio
+import aiohttp
+from livekit import api
+from src.logger.log import Log_class
+from src.user_utils.async_bridge import background_loop
+
+logg_obj = Log_class("logs", "livekit_client.txt")
+
+# Upper bound on pooled HTTP connections to the LiveKit server.
+LIVEKIT_POOL_SIZE = int(os.getenv("LIVEKIT_POOL_SIZE", 100))
+LIVEKIT_TIMEOUT = float(os.getenv("LIVEKIT_TIMEOUT", 10))
+
+#-----------------------Shared-LiveKit-Client------------------------#
+class LiveKitClient:
+    """One LiveKitAPI per process, bound to the shared background loop.
+
+    The aiohttp session (and therefore its keep-alive connections and TLS
+    sessions) lives as long as the process, so a dispatch costs one pooled
+    HTTP request.
+    """
+    _instance = None
+    _api = None
+    _session = None
+    _init_lock = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(LiveKitClient, cls).__new__(cls)
+        return cls._instance
+
+    async def get_api(self) -> api.LiveKitAPI:
+        """Return the shared client; must be awaited on the background loop."""
+        if self._api is None:
+            if LiveKitClient._init_lock is None:
+                LiveKitClient._init_lock = asyncio.Lock()
+            async with self._init_lock:
+                if self._api is None:
+                    connector = aiohttp.TCPConnector(limit=LIVEKIT_POOL_SIZE, keepalive_timeout=60)
+                    session = aiohttp.ClientSession(
+                        connector=connector,
+                        timeout=aiohttp.ClientTimeout(total=LIVEKIT_TIMEOUT),
+                    )
+                    LiveKitClient._session = session
+                    LiveKitClient._api = api.LiveKitAPI(session=session)
+                    atexit.register(self.close)
+                    logg_obj.Info_Log("Shared LiveKit API client created.")
+        return self._api
+
+    def run(self, coro, timeout=None):
+        """Sync bridge: run a coroutine on the shared loop from a Flask handler."""
+        return background_loop.run(coro, timeout)
+
+    def submit(self, coro):
+        return background_loop.submit(coro)
+
+    def close(self):
+        try:
+            background_loop.run(self.aclose(), timeout=5)
+        except Exception as e:
+            logg_obj.Error_Log(f"Failed to close LiveKit client: {str(e)}")
+
+    async def aclose(self):
+        if self._session is not None:
+            await self._session.close()
+        LiveKitClient._api = None
+        LiveKitClient._session = None
+
+# Create a singleton instance
+livekit_client = LiveKitClient()
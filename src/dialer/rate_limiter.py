@@ -0,0 +1,78 @@
+import os
+import time
+import asyncio
+import threading
+from src.logger.log import Log_class
+
+logg_obj = Log_class("logs", "rate_limiter.txt")
+
+# Twilio trunks start at 1 CPS unless the account has been raised.
+DEFAULT_TRUNK_CPS = float(os.getenv("DEFAULT_TRUNK_CPS", 1))
+DEFAULT_TRUNK_BURST = int(os.getenv("DEFAULT_TRUNK_BURST", 1))
+
+#---------------------------Token-Bucket-----------------------------#
+class TokenBucket:
+    """Async token bucket; callers queue in FIFO order until a token is free."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.configure(rate, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def configure(self, rate: float, burst: int = 1):
+        self.rate = max(float(rate), 0.01)
+        self.burst = max(int(burst), 1)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        # The lock is FIFO, so waiting dispatches are served in arrival order
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def penalize(self, seconds: float):
+        """Drain the bucket after an upstream rejection so the next dispatch backs off."""
+        self._refill()
+        self._tokens = min(self._tokens, 1 - seconds * self.rate)
+
+#---------------------------Trunk-Limiters---------------------------#
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_trunk_key(telephony_details: dict):
+    return telephony_details.get("lk_outbound_sip") or telephony_details.get("sip_trunk_sid")
+
+def get_trunk_limiter(telephony_details: dict, share: int = 1) -> TokenBucket:
+    """Return the process-wide limiter for a trunk, configured from its telephony_details record.
+
+    `share` splits the trunk's rate between processes dialing it at the same time.
+    """
+    key = get_trunk_key(telephony_details)
+    rate = (telephony_details.get("callsPerSecond") or DEFAULT_TRUNK_CPS) / max(int(share), 1)
+    burst = telephony_details.get("callsPerSecondBurst") or DEFAULT_TRUNK_BURST
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = TokenBucket(rate, burst)
+            _limiters[key] = limiter
+            logg_obj.Info_Log(f"Created rate limiter for trunk {key}: {rate} CPS, burst {burst}")
+        elif (limiter.rate, limiter.burst) != (max(float(rate), 0.01), max(int(burst), 1)):
+            limiter.configure(rate, burst)
+            logg_obj.Info_Log(f"Updated rate limiter for trunk {key}: {rate} CPS, burst {burst}")
+    return limiter
+
+#--------------------------Upstream-Rejections-----------------------#
+def is_rate_limited_error(error: Exception) -> bool:
+    """True when LiveKit/Twilio rejected a dispatch for capacity rather than a bad request."""
+    status = getattr(error, "status", None)
+    code = str(getattr(error, "code", "")).lower()
+    return status in (429, 503) or code in ("resource_exhausted", "unavailable")
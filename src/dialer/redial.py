@@ -0,0 +1,174 @@
+import os
+from datetime import datetime
+import pandas as pd
+from pymongo import UpdateOne
+from src.database.mongodb import db
+from src.logger.log import Log_class
+from src.dialer.batch_state import PENDING, DISPATCHED, FAILED
+from src.dialer.calling_window import align_to_window
+from src.dialer.columnar_batch import get_batch_storage, hydrate_contacts
+from src.dialer.suppression import add_do_not_call
+from src.user_utils.phone_numbers import PHONE_FIELDS
+
+logg_obj = Log_class("logs", "redial.txt")
+
+DEFAULT_MAX_ATTEMPTS = int(os.getenv("REDIAL_MAX_ATTEMPTS", 3))
+DEFAULT_BACKOFF_MINUTES = float(os.getenv("REDIAL_BACKOFF_MINUTES", 30))
+DEFAULT_BACKOFF_MULTIPLIER = float(os.getenv("REDIAL_BACKOFF_MULTIPLIER", 2))
+
+# Call outcomes reported by the agent that make a contact eligible for another attempt
+REDIAL_OUTCOMES = ("no_answer", "busy", "failed", "voicemail")
+# The callee asked not to be called again; the number goes on the tenant's do-not-call list
+OPTED_OUT = "opted_out"
+CALL_OUTCOMES = ("answered", "completed", OPTED_OUT) + REDIAL_OUTCOMES
+
+_indexes_ready = False
+
+def ensure_redial_indexes():
+    global _indexes_ready
+    if not _indexes_ready:
+        db.call_batch_details.create_index([("room_name", 1)], sparse=True)
+        db.call_batch_details.create_index([("next_attempt_at", 1)], sparse=True)
+        _indexes_ready = True
+
+#---------------------------Redial-Policy----------------------------#
+def build_redial_policy(max_attempts=None, backoff_minutes=None, backoff_multiplier=None) -> dict:
+    return {
+        "max_attempts": max(int(max_attempts or DEFAULT_MAX_ATTEMPTS), 1),
+        "backoff_minutes": float(backoff_minutes if backoff_minutes is not None else DEFAULT_BACKOFF_MINUTES),
+        "backoff_multiplier": float(backoff_multiplier or DEFAULT_BACKOFF_MULTIPLIER),
+    }
+
+def save_redial_policy(user_id: str, batch_name: str, policy: dict):
+    """Store the batch's policy on its call_batch_runs document (created here if needed)."""
+    db.call_batch_runs.update_one(
+        {"created_by": user_id, "batch_name": batch_name},
+        {"$set": {"redial_policy": policy}},
+        upsert=True,
+    )
+
+def get_redial_policy(user_id: str, batch_name: str) -> dict:
+    run = db.call_batch_runs.find_one({"created_by": user_id, "batch_name": batch_name}, {"redial_policy": 1}) or {}
+    return run.get("redial_policy") or build_redial_policy()
+
+def save_calling_window(user_id: str, batch_name: str, window_start: str, window_end: str,
+                        timezone: str = None, timezone_column: str = None):
+    """Store the batch's calling window so redials are only released inside it."""
+    db.call_batch_runs.update_one(
+        {"created_by": user_id, "batch_name": batch_name},
+        {"$set": {"calling_window": {
+            "start": window_start, "end": window_end, "timezone": timezone, "timezone_column": timezone_column,
+        }}},
+        upsert=True,
+    )
+
+def get_calling_window(user_id: str, batch_name: str):
+    run = db.call_batch_runs.find_one({"created_by": user_id, "batch_name": batch_name}, {"calling_window": 1}) or {}
+    return run.get("calling_window")
+
+def redial_update(policy: dict, now: datetime) -> list:
+    """Pipeline update putting a contact back to pending after backoff * multiplier^(attempts-1)."""
+    backoff_ms = policy["backoff_minutes"] * 60 * 1000
+    return [{
+        "$set": {
+            "dispatch_status": PENDING,
+            "last_outcome": {"$ifNull": ["$call_outcome", "$dispatch_status"]},
+            "next_attempt_at": {"$add": [now, {"$multiply": [
+                backoff_ms,
+                {"$pow": [policy["backoff_multiplier"], {"$max": [{"$subtract": [{"$ifNull": ["$attempts", 1]}, 1]}, 0]}]},
+            ]}]},
+        }
+    }, {"$unset": ["call_outcome", "dispatch_error", "room_name"]}]
+
+def redial_filter(policy: dict) -> dict:
+    # INTERRUPTED contacts are left out: up to a chunk of them reached the trunk before the crash
+    return {
+        "attempts": {"$lt": policy["max_attempts"]},
+        "$or": [
+            {"dispatch_status": FAILED},
+            {"dispatch_status": DISPATCHED, "call_outcome": {"$in": list(REDIAL_OUTCOMES)}},
+        ],
+    }
+
+#--------------------------Schedule-Redials--------------------------#
+def schedule_redials(user_id: str, batch_name: str) -> int:
+    """Put every eligible contact of a batch back in the queue with one bulk update."""
+    ensure_redial_indexes()
+    policy = get_redial_policy(user_id, batch_name)
+    result = db.call_batch_details.update_many(
+        {"created_by": user_id, "batch_name": batch_name, **redial_filter(policy)},
+        redial_update(policy, datetime.now()),
+    )
+    if result.modified_count:
+        logg_obj.Info_Log(f"{batch_name}: scheduled {result.modified_count} contacts for redial")
+        align_redials(user_id, batch_name)
+    return result.modified_count
+
+def align_redials(user_id: str, batch_name: str, contact_ids: list = None) -> int:
+    """Move queued redials of a windowed batch that fall outside the window to its next opening."""
+    window = get_calling_window(user_id, batch_name)
+    if not window:
+        return 0
+    query = {"created_by": user_id, "batch_name": batch_name, "dispatch_status": PENDING, "next_attempt_at": {"$ne": None}}
+    if contact_ids is not None:
+        query["_id"] = {"$in": contact_ids}
+    timezone_column = window.get("timezone_column")
+    projection = {"next_attempt_at": 1, "row": 1}
+    if timezone_column:
+        projection[timezone_column] = 1
+    contacts = list(db.call_batch_details.find(query, projection))
+    if not contacts:
+        return 0
+    storage = get_batch_storage(user_id, batch_name)
+    if storage is not None and timezone_column:
+        # Columnar batches keep the contact columns in the batch's Parquet file
+        contacts = hydrate_contacts(storage, contacts, [timezone_column])
+    frame = pd.DataFrame(contacts)
+    zones = frame[timezone_column] if timezone_column in frame.columns else pd.Series(None, index=frame.index, dtype="string")
+    zones = zones.astype("string").fillna(window.get("timezone") or "")
+    aligned = align_to_window(frame["next_attempt_at"], zones, window["start"], window["end"])
+    changed = aligned.ne(pd.to_datetime(frame["next_attempt_at"]))
+    operations = [
+        UpdateOne({"_id": contact_id, "dispatch_status": PENDING}, {"$set": {"next_attempt_at": when.to_pydatetime()}})
+        for contact_id, when in zip(frame.loc[changed, "_id"], aligned[changed])
+    ]
+    if operations:
+        db.call_batch_details.bulk_write(operations, ordered=False)
+        logg_obj.Info_Log(f"{batch_name}: moved {len(operations)} redials to the next calling window opening")
+    return len(operations)
+
+def record_call_outcome(user_id: str, room_name: str, outcome: str) -> bool:
+    """Store the agent-reported outcome of a call and queue a redial when it qualifies.
+
+    Only a call of a batch created by `user_id` is updated.
+    """
+    ensure_redial_indexes()
+    contact = db.call_batch_details.find_one_and_update(
+        {"room_name": room_name, "created_by": user_id},
+        {"$set": {"call_outcome": outcome, "call_outcome_at": datetime.utcnow()}},
+        projection={"created_by": 1, "batch_name": 1, **{field: 1 for field in PHONE_FIELDS}},
+    )
+    if contact is None:
+        return False
+    if outcome == OPTED_OUT:
+        phone_number = next((contact[field] for field in PHONE_FIELDS if contact.get(field)), None)
+        if phone_number:
+            add_do_not_call(contact["created_by"], [phone_number], reason=OPTED_OUT)
+    if outcome in REDIAL_OUTCOMES:
+        policy = get_redial_policy(contact["created_by"], contact["batch_name"])
+        result = db.call_batch_details.update_one(
+            {"_id": contact["_id"], **redial_filter(policy)}, redial_update(policy, datetime.now())
+        )
+        if result.modified_count:
+            align_redials(contact["created_by"], contact["batch_name"], [contact["_id"]])
+    return True
+
+#---------------------------Due-Redials------------------------------#
+def find_due_redial_batches() -> list:
+    """(user_id, batch_name) of batches with redials whose backoff has elapsed."""
+    ensure_redial_indexes()
+    due = db.call_batch_details.aggregate([
+        {"$match": {"next_attempt_at": {"$lte": datetime.now()}, "dispatch_status": PENDING}},
+        {"$group": {"_id": {"created_by": "$created_by", "batch_name": "$batch_name"}}},
+    ])
+    return [(item["_id"]["created_by"], item["_id"]["batch_name"]) for item in due]
@@ -0,0 +1,223 @@
+import os
+import time
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from pymongo import UpdateOne
+from src.database.mongodb import db
+from src.logger.log import Log_class
+from src.user_utils.phone_numbers import PHONE_FIELDS, normalize_phone_numbers
+
+logg_obj = Log_class("logs", "suppression.txt")
+
+# A number dialed by another batch of the same tenant within this many hours is not dialed again (0 disables).
+RECENT_CONTACT_HOURS = float(os.getenv("RECENT_CONTACT_HOURS", 24))
+# How often an index pulls new entries from Mongo, and how often it is rebuilt from scratch.
+SUPPRESSION_REFRESH_SECONDS = float(os.getenv("SUPPRESSION_REFRESH_SECONDS", 30))
+SUPPRESSION_REBUILD_SECONDS = float(os.getenv("SUPPRESSION_REBUILD_SECONDS", 3600))
+
+# Reasons a number is suppressed
+DO_NOT_CALL = "do_not_call"
+RECENT_CONTACT = "recent_contact"
+
+_indexes_ready = False
+
+def ensure_indexes():
+    global _indexes_ready
+    if not _indexes_ready:
+        db.do_not_call.create_index([("user_id", 1), ("phone", 1)], unique=True)
+        db.do_not_call.create_index([("user_id", 1), ("updated_at", 1)])
+        db.call_batch_details.create_index([("created_by", 1), ("dispatched_at", 1)], sparse=True)
+        _indexes_ready = True
+
+def phone_keys(numbers) -> np.ndarray:
+    """Phone numbers as int64 keys of their E.164 digits (15 digits always fit); -1 for invalid numbers."""
+    numbers = pd.Series(numbers, dtype=object).astype("string")
+    # Numbers stored after ingest are already E.164; only the rest go through the normalizer
+    e164 = numbers.str.fullmatch(r"\+[1-9]\d{7,14}").fillna(False).astype(bool)
+    if not e164.all():
+        numbers = numbers.where(e164, normalize_phone_numbers(numbers[~e164]))
+    return pd.to_numeric(numbers.str.slice(1), errors="coerce").fillna(-1).astype("int64").to_numpy()
+
+def sorted_lookup(keys: np.ndarray, table: np.ndarray):
+    """Positions of `keys` in the sorted `table` and whether each key is present."""
+    if not len(table):
+        return np.zeros(len(keys), dtype=np.int64), np.zeros(len(keys), dtype=bool)
+    positions = np.minimum(np.searchsorted(table, keys), len(table) - 1)
+    return positions, table[positions] == keys
+
+#------------------------Tenant-Suppression--------------------------#
+class TenantSuppression:
+    """Numbers one tenant must not dial, held as sorted int64 arrays.
+
+    The do-not-call list and the numbers dialed recently are pulled from Mongo
+    incrementally using updated_at / dispatched_at watermarks, so a refresh
+    only reads what changed since the previous one.
+    """
+
+    def __init__(self, tenant: str):
+        self.tenant = tenant
+        self.lock = threading.Lock()
+        self.reset()
+        self.refreshed_at = None
+        self.rebuilt_at = None
+
+    def reset(self):
+        self.do_not_call = np.empty(0, dtype=np.int64)
+        self.do_not_call_watermark = None
+        # Last dispatch per number: sorted numbers with the time and batch of that dispatch
+        self.recent_numbers = np.empty(0, dtype=np.int64)
+        self.recent_at = np.empty(0, dtype="datetime64[ms]")
+        self.recent_batch = np.empty(0, dtype=object)
+        self.recent_watermark = None
+
+    def refresh(self, force: bool = False):
+        now = time.monotonic()
+        with self.lock:
+            if not force and self.refreshed_at is not None and now - self.refreshed_at < SUPPRESSION_REFRESH_SECONDS:
+                return
+            rebuild = self.rebuilt_at is None or now - self.rebuilt_at >= SUPPRESSION_REBUILD_SECONDS
+            if rebuild:
+                # Periodic full rebuild also drops entries removed by other processes
+                self.reset()
+                self.rebuilt_at = now
+            ensure_indexes()
+            self.load_do_not_call()
+            self.load_recent_contacts()
+            self.refreshed_at = now
+            if rebuild:
+                logg_obj.Info_Log(
+                    f"Suppression index for {self.tenant}: {len(self.do_not_call)} do-not-call, "
+                    f"{len(self.recent_numbers)} recently dialed numbers"
+                )
+
+    def load_do_not_call(self):
+        query = {"user_id": {"$in": [self.tenant, None]}}
+        if self.do_not_call_watermark is not None:
+            # $gte re-reads entries sharing the watermark; merging them again is harmless
+            query["updated_at"] = {"$gte": self.do_not_call_watermark}
+        entries = list(db.do_not_call.find(query, {"phone": 1, "active": 1, "updated_at": 1}))
+        if not entries:
+            return
+        keys = phone_keys([entry.get("phone") for entry in entries])
+        active = np.array([entry.get("active", True) for entry in entries], dtype=bool)
+        self.do_not_call = np.setdiff1d(self.do_not_call, keys[~active])
+        self.do_not_call = np.union1d(self.do_not_call, keys[active & (keys >= 0)])
+        self.do_not_call_watermark = max(entry["updated_at"] for entry in entries)
+
+    def load_recent_contacts(self):
+        if RECENT_CONTACT_HOURS <= 0:
+            return
+        since = datetime.utcnow() - timedelta(hours=RECENT_CONTACT_HOURS)
+        if self.recent_watermark is not None:
+            since = max(since, self.recent_watermark)
+        contacts = list(db.call_batch_details.find(
+            {"created_by": self.tenant, "dispatched_at": {"$gte": since}},
+            {"_id": 0, "batch_name": 1, "dispatched_at": 1, **{field: 1 for field in PHONE_FIELDS}},
+        ))
+        if not contacts:
+            return
+        frame = pd.DataFrame(contacts)
+        phone_columns = [field for field in PHONE_FIELDS if field in frame.columns]
+        if not phone_columns:
+            return
+        phones = frame[phone_columns].bfill(axis=1).iloc[:, 0]
+        numbers = np.concatenate([self.recent_numbers, phone_keys(phones)])
+        dispatched_at = np.concatenate([self.recent_at, frame["dispatched_at"].to_numpy().astype("datetime64[ms]")])
+        batches = np.concatenate([self.recent_batch, frame["batch_name"].to_numpy(dtype=object)])
+        # Keep only the latest dispatch per number
+        order = np.lexsort((dispatched_at, numbers))
+        numbers, dispatched_at, batches = numbers[order], dispatched_at[order], batches[order]
+        latest = np.append(numbers[1:] != numbers[:-1], True) & (numbers >= 0)
+        self.recent_numbers, self.recent_at, self.recent_batch = numbers[latest], dispatched_at[latest], batches[latest]
+        self.recent_watermark = frame["dispatched_at"].max().to_pydatetime()
+
+    def check(self, numbers, batch_name: str = None, recent: bool = True) -> np.ndarray:
+        """Suppression reason per number (None when it may be dialed).
+
+        Dispatches made by `batch_name` itself do not count as recent contact,
+        so the batch's own redials still go out. With recent=False only the
+        do-not-call list is checked.
+        """
+        self.refresh()
+        keys = phone_keys(numbers)
+        reasons = np.full(len(keys), None, dtype=object)
+        with self.lock:
+            do_not_call = self.do_not_call
+            recent_numbers, recent_at, recent_batch = self.recent_numbers, self.recent_at, self.recent_batch
+        if recent and RECENT_CONTACT_HOURS > 0:
+            since = np.datetime64(datetime.utcnow() - timedelta(hours=RECENT_CONTACT_HOURS), "ms")
+            positions, found = sorted_lookup(keys, recent_numbers)
+            if len(recent_numbers):
+                found &= (recent_at[positions] >= since) & (recent_batch[positions] != batch_name)
+            reasons[found] = RECENT_CONTACT
+        _, found = sorted_lookup(keys, do_not_call)
+        reasons[found] = DO_NOT_CALL
+        reasons[keys < 0] = None
+        return reasons
+
+#-------------------------Suppression-Index--------------------------#
+class SuppressionIndex:
+    """Process-wide registry of per-tenant suppression lists."""
+
+    def __init__(self):
+        self.tenants = {}
+        self.lock = threading.Lock()
+
+    def tenant(self, tenant: str) -> TenantSuppression:
+        with self.lock:
+            if tenant not in self.tenants:
+                self.tenants[tenant] = TenantSuppression(tenant)
+            return self.tenants[tenant]
+
+    def check(self, tenant: str, numbers, batch_name: str = None, recent: bool = True) -> np.ndarray:
+        return self.tenant(tenant).check(numbers, batch_name, recent)
+
+    def filter_frame(self, tenant: str, df: pd.DataFrame, phone_column: str, batch_name: str = None, recent: bool = True):
+        """Drop suppressed contacts from `df`; returns (df, {reason: count})."""
+        if phone_column is None or df.empty:
+            return df, {}
+        reasons = self.check(tenant, df[phone_column].to_numpy(dtype=object), batch_name, recent)
+        suppressed = pd.notna(reasons)
+        counts = pd.Series(reasons[suppressed]).value_counts().to_dict()
+        return df[~suppressed], {reason: int(count) for reason, count in counts.items()}
+
+    def invalidate(self, tenant: str):
+        """Pick up changes made by this process on the next check."""
+        self.tenant(tenant).refresh(force=True)
+
+suppression_index = SuppressionIndex()
+
+#---------------------------Do-Not-Call------------------------------#
+def add_do_not_call(user_id: str, phone_numbers: list, reason: str = None) -> dict:
+    """Add numbers to the tenant's do-not-call list; returns the stored and rejected numbers."""
+    ensure_indexes()
+    normalized = normalize_phone_numbers(pd.Series(phone_numbers, dtype=object))
+    valid = normalized.dropna().unique().tolist()
+    now = datetime.utcnow()
+    if valid:
+        db.do_not_call.bulk_write([
+            UpdateOne(
+                {"user_id": user_id, "phone": phone},
+                {"$set": {"active": True, "reason": reason, "updated_at": now}, "$setOnInsert": {"created_at": now}},
+                upsert=True,
+            )
+            for phone in valid
+        ], ordered=False)
+        suppression_index.invalidate(user_id)
+    rejected = [str(number) for number, phone in zip(phone_numbers, normalized) if pd.isna(phone)]
+    return {"added": valid, "invalid": rejected}
+
+def remove_do_not_call(user_id: str, phone_numbers: list) -> int:
+    ensure_indexes()
+    normalized = normalize_phone_numbers(pd.Series(phone_numbers, dtype=object)).dropna().unique().tolist()
+    if not normalized:
+        return 0
+    # Entries are deactivated rather than deleted so incremental refreshes see the removal
+    result = db.do_not_call.update_many(
+        {"user_id": user_id, "phone": {"$in": normalized}, "active": True},
+        {"$set": {"active": False, "updated_at": datetime.utcnow()}},
+    )
+    suppression_index.invalidate(user_id)
+    return result.modified_count
@@ -17,6 +17,16 @@ class Log_class:
         except Exception as e:
             raise e
 
+    def Warning_Log(self, log_message):
+        try:
+            now = datetime.now()
+            date = now.date()
+            current_time = now.strftime("%H:%M:%S")
+            with open(os.path.join(self.folder_path, self.file_name), 'a') as file:
+                file.write(f"{date}\t{current_time}\t\tWARNING\t\t{log_message}\n")
+        except Exception as e:
+            raise e
+
     def Error_Log(self, log_message):
         try:
             now = datetime.now()
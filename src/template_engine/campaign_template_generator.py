@@ -1,21 +1,32 @@
 import pandas as pd
 from src.components.model import OpenAIModel
 from src.components.template import get_campaign_prompt
+from src.database.knowledge_base_store import resolve_knowledge_base
+from src.template_engine.compiled_template import compile_template
 
 class CampaignTemplateGenerator:
     def __init__(self):
         pass
-    def generate_templates(self, campaign_columns, camapign_data):
+    def generate_templates(self, campaign_columns, camapign_data, refresh=False):
         try:
+            # Campaigns may reference their knowledge base by content hash
+            camapign_data = {**camapign_data, "knowledge_base": resolve_knowledge_base(camapign_data)}
             campaign_prompt = get_campaign_prompt(campaign_columns,camapign_data)
-            campaign_templates = OpenAIModel().run(campaign_prompt)
+            campaign_templates = OpenAIModel().run(campaign_prompt, use_cache=not refresh)
+            # Compile the suggestions now so picking one for a batch skips the parse
+            for template in campaign_templates.values():
+                if isinstance(template, str):
+                    compile_template(template)
             return campaign_templates
         except Exception as e:
             print("error in generate_templates", str(e))
             return {}
     def evaluate_fstring_templates(self,campaign_templates,campaign_data):
         try:
-            return campaign_templates.format(**campaign_data).replace("f","")
+            return compile_template(campaign_templates).render(campaign_data)
         except Exception as e:
             print(str(e))
-            return []
\ No newline at end of file
+            return []
+    def evaluate_frame_templates(self, campaign_templates, contacts_df):
+        # The compiled template is cached, so only the column-wise render runs per batch
+        return compile_template(campaign_templates).render_frame(contacts_df)
\ No newline at end of file
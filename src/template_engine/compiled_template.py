@@ -0,0 +1,140 @@
+import os
+import re
+import string
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# LLM-generated templates often come back wrapped as an f-string literal: f"Hello {name}"
+FSTRING_WRAPPER = re.compile(r'^\s*[fF](\'\'\'|"""|\'|")(.*)\1\s*$', re.DOTALL)
+# Distinct templates kept compiled in memory.
+TEMPLATE_CACHE_SIZE = int(os.getenv("TEMPLATE_CACHE_SIZE", 256))
+
+def strip_fstring_prefix(template: str) -> str:
+    match = FSTRING_WRAPPER.match(template)
+    return match.group(2) if match else template
+
+def records_frame(records: list) -> pd.DataFrame:
+    """DataFrame of JSON contact records that renders like str.format on each record.
+
+    pandas turns an integer field into float64 when any record lacks it or
+    holds a float, and 500 would render as "500.0"; such fields are kept as
+    the original values in an object column instead.
+    """
+    df = pd.DataFrame(records)
+    for column in df.columns:
+        if not pd.api.types.is_float_dtype(df[column].dtype):
+            continue
+        values = [record.get(column) if isinstance(record, dict) else None for record in records]
+        if any(isinstance(value, int) and not isinstance(value, bool) for value in values):
+            df[column] = pd.Series(values, index=df.index, dtype=object)
+    return df
+
+#--------------------------Compiled-Template-------------------------#
+class CompiledTemplate:
+    """A campaign template parsed once into literal segments and placeholders.
+
+    Renders a single contact like str.format, or a whole DataFrame column-wise
+    so the per-contact cost is a few vectorized string concatenations.
+    """
+
+    def __init__(self, template: str):
+        self.source = template
+        self.text = strip_fstring_prefix(template)
+        self.segments = []
+        # Syntax problems found while parsing; a template with errors cannot be rendered
+        self.errors = []
+        open_braces = template.count('{')
+        close_braces = template.count('}')
+        if open_braces != close_braces:
+            self.errors.append(f"Unmatched braces: {{ count = {open_braces} vs }} count = {close_braces}")
+        try:
+            for literal, field_name, format_spec, conversion in string.Formatter().parse(self.text):
+                self.segments.append((literal, field_name, format_spec, conversion))
+        except ValueError as e:
+            self.segments = []
+            self.errors.append(f"Invalid template: {str(e)}")
+        self.fields = list(dict.fromkeys(field for _, field, _, _ in self.segments if field))
+
+    def missing_columns(self, columns) -> list:
+        columns = set(columns)
+        return [field for field in self.fields if field not in columns]
+
+    def render(self, row: dict) -> str:
+        return self.text.format(**row)
+
+    def column_text(self, column: pd.Series, format_spec: str, conversion: str) -> pd.Series:
+        if format_spec or conversion:
+            convert = {"r": repr, "a": ascii, "s": str}.get(conversion, lambda value: value)
+            return column.map(lambda value: format(convert(value), format_spec))
+        if pd.api.types.is_numeric_dtype(column.dtype):
+            # numpy's str cast matches str() for ints, floats (incl. nan) and bools
+            return pd.Series(column.to_numpy().astype(str).astype(object), index=column.index)
+        if pd.api.types.is_datetime64_dtype(column.dtype) and not (column.dt.microsecond.any() or column.dt.nanosecond.any()):
+            # Whole-second naive timestamps: str(Timestamp) is the ISO form with a space separator
+            text = np.char.replace(column.to_numpy().astype("datetime64[s]").astype(str), "T", " ")
+            return pd.Series(np.where(column.isna(), "NaT", text).astype(object), index=column.index)
+        # Object, string and datetime columns: str() per value, as str.format would do
+        return column.map(str).astype(object)
+
+    def render_frame(self, df: pd.DataFrame) -> pd.Series:
+        """Render every row of `df`; placeholders must be columns of the frame."""
+        if self.errors:
+            raise ValueError(" ,".join(self.errors))
+        missing = self.missing_columns(df.columns)
+        if missing:
+            raise KeyError(f"Template placeholders not in columns: {', '.join(missing)}")
+        parts = []
+        for literal, field_name, format_spec, conversion in self.segments:
+            if literal:
+                parts.append(literal)
+            if field_name:
+                parts.append(self.column_text(df[field_name], format_spec, conversion))
+        if not any(isinstance(part, pd.Series) for part in parts):
+            return pd.Series("".join(parts), index=df.index, dtype=object)
+
+        # Fold adjacent pieces left to right: literal + column is one vectorized concat
+        rendered = None
+        prefix = ""
+        for part in parts:
+            if isinstance(part, str):
+                if rendered is None:
+                    prefix += part
+                else:
+                    rendered = rendered + part
+            else:
+                rendered = (prefix + part) if rendered is None else rendered + part
+                prefix = ""
+        return rendered
+
+#---------------------------Template-Cache---------------------------#
+_template_cache = OrderedDict()
+_template_cache_lock = threading.Lock()
+_template_cache_stats = {"hits": 0, "misses": 0}
+
+def template_key(template: str) -> str:
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()
+
+def compile_template(template: str) -> CompiledTemplate:
+    """Return the compiled form of `template`, parsing it only the first time it is seen."""
+    key = template_key(template)
+    with _template_cache_lock:
+        compiled = _template_cache.get(key)
+        if compiled is not None:
+            _template_cache.move_to_end(key)
+            _template_cache_stats["hits"] += 1
+            return compiled
+        _template_cache_stats["misses"] += 1
+    compiled = CompiledTemplate(template)
+    with _template_cache_lock:
+        _template_cache[key] = compiled
+        _template_cache.move_to_end(key)
+        while len(_template_cache) > TEMPLATE_CACHE_SIZE:
+            _template_cache.popitem(last=False)
+    return compiled
+
+def template_cache_info() -> dict:
+    with _template_cache_lock:
+        return {**_template_cache_stats, "size": len(_template_cache), "max_size": TEMPLATE_CACHE_SIZE}
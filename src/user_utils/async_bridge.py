@@ -0,0 +1,59 @@
+import asyncio
+import atexit
+import threading
+from src.logger.log import Log_class
+
+logg_obj = Log_class("logs", "async_bridge.txt")
+
+#----------------------Background-Event-Loop-------------------------#
+class BackgroundLoop:
+    """Process-wide asyncio loop running on a daemon thread.
+
+    Sync code (Flask handlers, scheduler jobs) hands coroutines to this loop
+    instead of calling asyncio.run, so long-lived async clients keep their
+    connection pools between requests.
+    """
+    _instance = None
+    _loop = None
+    _thread = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(BackgroundLoop, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="background-loop", daemon=True)
+                thread.start()
+                BackgroundLoop._loop = loop
+                BackgroundLoop._thread = thread
+                atexit.register(self.stop)
+                logg_obj.Info_Log("Background event loop started.")
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    def in_loop(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def submit(self, coro):
+        """Schedule a coroutine on the loop and return a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the loop and block the calling thread for its result."""
+        if self.in_loop():
+            raise RuntimeError("BackgroundLoop.run cannot be called from the background loop itself")
+        return self.submit(coro).result(timeout)
+
+    def stop(self):
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+# Create a singleton instance
+background_loop = BackgroundLoop()
@@ -0,0 +1,51 @@
+import os
+import pandas as pd
+from src.user_utils.utils import to_snake_case
+from src.user_utils.excel_reader import iter_excel_chunks
+from src.user_utils.phone_numbers import clean_contacts
+
+# Rows parsed per chunk when streaming contact files.
+CONTACT_CHUNK_SIZE = int(os.getenv("CONTACT_CHUNK_SIZE", 10000))
+CONTACT_EXTENSIONS = ['xlsx', 'xls', 'csv']
+
+#-----------------------Chunked-Contact-Reader-----------------------#
+def iter_contact_chunks(file_stream, ext: str, chunksize: int = CONTACT_CHUNK_SIZE):
+    """Yield the contact file as DataFrames of at most `chunksize` rows with snake_case columns."""
+    if ext == 'csv':
+        for chunk in pd.read_csv(file_stream, chunksize=chunksize):
+            chunk.columns = [to_snake_case(col) for col in chunk.columns]
+            yield chunk
+    elif ext in ['xlsx', 'xls']:
+        # Rows are streamed from the workbook instead of parsing the whole sheet first
+        for chunk in iter_excel_chunks(file_stream.read(), ext, chunksize):
+            chunk.columns = [to_snake_case(col) for col in chunk.columns]
+            yield chunk
+    else:
+        raise ValueError(f"Unsupported file type: {ext}")
+
+def iter_ndjson(chunks):
+    """Serialize DataFrame chunks as newline-delimited JSON records."""
+    for chunk in chunks:
+        if len(chunk):
+            lines = chunk.to_json(orient='records', lines=True, date_format='iso', force_ascii=False)
+            # Older pandas omits the trailing newline, which would join two chunks
+            yield lines if lines.endswith("\n") else lines + "\n"
+
+def read_contact_page(file_stream, ext: str, page: int, page_size: int):
+    """Return (records, has_more, report) for one page, parsing only the rows up to that page.
+
+    Phone numbers are normalized like the other upload modes; invalid numbers
+    and duplicates within the page are dropped. Duplicates of numbers on
+    other pages cannot be seen from one page and are kept.
+    """
+    start = page * page_size
+    if ext == 'csv':
+        # Read one extra row to know whether another page follows
+        df = pd.read_csv(file_stream, skiprows=range(1, start + 1), nrows=page_size + 1)
+    else:
+        df = next(iter_excel_chunks(file_stream.read(), ext, page_size + 1, skip_rows=start), pd.DataFrame())
+    df.columns = [to_snake_case(col) for col in df.columns]
+    has_more = len(df) > page_size
+    df, report = clean_contacts(df.iloc[:page_size])
+    # Round-trip through JSON so NaN becomes null
+    return df.to_json(orient='records', date_format='iso', force_ascii=False), has_more, report
@@ -0,0 +1,113 @@
+import os
+import io
+from itertools import islice
+import numpy as np
+import pandas as pd
+from src.user_utils.process_pool import get_process_pool, PARSE_WORKERS
+
+# "calamine" (python-calamine, Rust), "openpyxl" (read-only streaming) or "auto" to use calamine when installed.
+EXCEL_ENGINE = os.getenv("EXCEL_ENGINE", "auto")
+# Rows per DataFrame when an Excel sheet is streamed.
+EXCEL_CHUNK_SIZE = int(os.getenv("EXCEL_CHUNK_SIZE", 10000))
+ALL_SHEETS = "all"
+
+def calamine_available() -> bool:
+    try:
+        import python_calamine
+        return True
+    except ImportError:
+        return False
+
+def resolve_engine(ext: str, engine: str = None) -> str:
+    engine = engine or EXCEL_ENGINE
+    if engine == "auto":
+        engine = "calamine" if calamine_available() else "openpyxl"
+    # openpyxl only reads .xlsx; legacy .xls needs calamine or xlrd
+    if engine == "openpyxl" and ext == "xls":
+        engine = "xlrd"
+    return engine
+
+#--------------------------Row-Streaming-----------------------------#
+def iter_sheet_rows(data: bytes, ext: str, sheet=0, engine: str = None):
+    """Yield the rows of one sheet as tuples, without building the whole sheet in memory."""
+    engine = resolve_engine(ext, engine)
+    if engine == "calamine":
+        from python_calamine import CalamineWorkbook
+        workbook = CalamineWorkbook.from_filelike(io.BytesIO(data))
+        worksheet = workbook.get_sheet_by_index(sheet) if isinstance(sheet, int) else workbook.get_sheet_by_name(sheet)
+        # calamine reports empty cells as ""
+        for row in worksheet.iter_rows():
+            yield tuple(None if value == "" else value for value in row)
+    elif engine == "openpyxl":
+        from openpyxl import load_workbook
+        workbook = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+        try:
+            worksheet = workbook.worksheets[sheet] if isinstance(sheet, int) else workbook[sheet]
+            yield from worksheet.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+    else:
+        df = pd.read_excel(io.BytesIO(data), engine=engine, sheet_name=sheet, header=None)
+        yield from df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+def header_names(header) -> list:
+    return [f"Unnamed: {index}" if value is None else str(value) for index, value in enumerate(header)]
+
+def excel_types(df: pd.DataFrame) -> pd.DataFrame:
+    """Match pd.read_excel typing: whole-number float columns become int, date cells datetime64."""
+    df = df.infer_objects()
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_float_dtype(values.dtype):
+            if values.notna().all() and (values == np.floor(values)).all():
+                df[column] = values.astype("int64")
+        elif values.dtype == object and pd.api.types.infer_dtype(values, skipna=True) in ("date", "datetime"):
+            df[column] = pd.to_datetime(values).dt.as_unit("us")
+    return df
+
+def iter_excel_chunks(data: bytes, ext: str, chunksize: int = EXCEL_CHUNK_SIZE, sheet=0, engine: str = None, skip_rows: int = 0):
+    """Yield one sheet as DataFrames of at most `chunksize` rows; the first row is the header."""
+    rows = iter_sheet_rows(data, ext, sheet, engine)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = header_names(header)
+    # Blank trailing rows are common in exported workbooks
+    rows = (row for row in rows if any(value is not None for value in row))
+    if skip_rows:
+        rows = islice(rows, skip_rows, None)
+    while True:
+        chunk = list(islice(rows, chunksize))
+        if not chunk:
+            return
+        width = len(columns)
+        chunk = [tuple(row[:width]) + (None,) * (width - len(row)) for row in chunk]
+        yield excel_types(pd.DataFrame(chunk, columns=columns))
+
+#---------------------------Whole-Sheets-----------------------------#
+def sheet_names(data: bytes, ext: str, engine: str = None) -> list:
+    if resolve_engine(ext, engine) == "calamine":
+        from python_calamine import CalamineWorkbook
+        return CalamineWorkbook.from_filelike(io.BytesIO(data)).sheet_names
+    return pd.ExcelFile(io.BytesIO(data)).sheet_names
+
+def read_sheet(data: bytes, ext: str, sheet=0, engine: str = None) -> pd.DataFrame:
+    chunks = list(iter_excel_chunks(data, ext, sheet=sheet, engine=engine))
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+def read_excel_frame(data: bytes, ext: str, sheets: str = None, engine: str = None) -> pd.DataFrame:
+    """Parse an Excel workbook: the first sheet, or with sheets="all" every sheet stacked.
+
+    Sheets of a multi-sheet workbook are parsed side by side in the shared
+    process pool.
+    """
+    if sheets != ALL_SHEETS:
+        return read_sheet(data, ext, 0, engine)
+    names = sheet_names(data, ext, engine)
+    if len(names) > 1 and PARSE_WORKERS > 1:
+        pool = get_process_pool()
+        frames = list(pool.map(read_sheet, [data] * len(names), [ext] * len(names), names, [engine] * len(names)))
+    else:
+        frames = [read_sheet(data, ext, name, engine) for name in names]
+    frames = [frame for frame in frames if not frame.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
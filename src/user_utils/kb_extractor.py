@@ -0,0 +1,75 @@
+import os
+import io
+import re
+import tempfile
+import fitz
+import docx
+from src.user_utils.process_pool import get_process_pool, PARSE_WORKERS
+
+# PDF pages extracted per pool task; smaller documents are read in the request thread.
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", 25))
+# DOCX paragraphs per streamed piece.
+DOCX_PARAGRAPHS_PER_PIECE = 200
+KB_EXTENSIONS = ['txt', 'pdf', 'docx']
+# Bump when extraction or cleanup changes so stored knowledge-base text is extracted again.
+KB_EXTRACTOR_VERSION = 1
+
+WHITESPACE = re.compile(r"\s+")
+
+def clean_text(text: str) -> str:
+    """Collapse every whitespace run (newlines included) to one space in a single pass."""
+    return WHITESPACE.sub(" ", text).strip()
+
+#-----------------------------PDF-Pages------------------------------#
+def extract_pdf_range(path: str, start: int, stop: int) -> str:
+    """Text of pages [start, stop) of the PDF at `path`; runs inside a pool worker."""
+    with fitz.open(path) as doc:
+        return clean_text("".join(doc[number].get_text() for number in range(start, stop)))
+
+def iter_pdf_text(data: bytes):
+    """Yield (first_page, last_page, text) pieces of a PDF in page order.
+
+    Long documents are split into page ranges extracted in the shared process
+    pool; each piece is yielded as soon as it and every piece before it are done.
+    """
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        page_count = doc.page_count
+        if page_count <= PDF_PAGES_PER_TASK or PARSE_WORKERS <= 1:
+            for start in range(0, page_count, PDF_PAGES_PER_TASK):
+                stop = min(start + PDF_PAGES_PER_TASK, page_count)
+                yield start + 1, stop, clean_text("".join(doc[number].get_text() for number in range(start, stop)))
+            return
+    # Workers open the document from disk instead of receiving the bytes with every task
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf_file:
+        pdf_file.write(data)
+        pdf_file.flush()
+        pool = get_process_pool()
+        ranges = [(start, min(start + PDF_PAGES_PER_TASK, page_count)) for start in range(0, page_count, PDF_PAGES_PER_TASK)]
+        futures = [pool.submit(extract_pdf_range, pdf_file.name, start, stop) for start, stop in ranges]
+        try:
+            for (start, stop), future in zip(ranges, futures):
+                yield start + 1, stop, future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+#-----------------------------Documents------------------------------#
+def iter_docx_text(data: bytes):
+    paragraphs = [paragraph.text for paragraph in docx.Document(io.BytesIO(data)).paragraphs]
+    for start in range(0, len(paragraphs), DOCX_PARAGRAPHS_PER_PIECE):
+        yield None, None, clean_text(" ".join(paragraphs[start:start + DOCX_PARAGRAPHS_PER_PIECE]))
+
+def iter_document_text(data: bytes, ext: str):
+    """Yield (first_page, last_page, text) pieces of a knowledge-base file; pages are None for txt/docx."""
+    if ext == 'txt':
+        yield None, None, clean_text(data.decode('utf-8'))
+    elif ext == 'pdf':
+        yield from iter_pdf_text(data)
+    elif ext == 'docx':
+        yield from iter_docx_text(data)
+    else:
+        raise ValueError(f"Unsupported file format: {ext}")
+
+def extract_document_text(data: bytes, ext: str) -> str:
+    """Whole cleaned text of a knowledge-base file, joined once."""
+    return " ".join(text for _, _, text in iter_document_text(data, ext) if text)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 #------------CreateCampaign------------#
 class CreateCampaign(BaseModel):
@@ -7,7 +7,8 @@ class CreateCampaign(BaseModel):
     campaign_description: str
     voice: str
     language: str
-    knowledge_base: str
+    knowledge_base: Optional[str] = None
+    knowledge_base_id: Optional[str] = None
     tone: str
     first_line: str
     system_prompt: str
@@ -20,12 +21,24 @@ class CallBatch(BaseModel):
     batch_name: str
     campaign_template: str
     scheduledTime: str
-    callDetails: List[Any]
+    callDetails: Optional[List[Any]] = None
+    file_id: Optional[str] = None
+    callingWindowStart: Optional[str] = None
+    callingWindowEnd: Optional[str] = None
+    timezone: Optional[str] = None
+    timezoneColumn: Optional[str] = None
+    callsPerMinute: Optional[int] = None
+    maxAttempts: Optional[int] = None
+    redialBackoffMinutes: Optional[float] = None
+    redialBackoffMultiplier: Optional[float] = None
+    storageFormat: Optional[str] = None
 
 #---------------------------------#
 class CampaignTemplates(BaseModel):
     campaign_id: str
-    callDetails: List[Any]
+    callDetails: Optional[List[Any]] = None
+    file_id: Optional[str] = None
+    refresh: bool = False
 
 #--------------------------------#
 class AddTelephony(BaseModel):
@@ -33,8 +46,24 @@ class AddTelephony(BaseModel):
    twilioAuthToken : str
    twilioPhoneNumber : str
    voiceProvider : str
+   callsPerSecond : Optional[float] = None
+   callsPerSecondBurst : Optional[int] = None
+   maxConcurrentCalls : Optional[int] = None
+   dispatchWeight : Optional[int] = None
 
 #--------------------------------#
 class LaunchCall(BaseModel):
     batch_name : str
     user_id : str
+    wait : bool = False
+    distributed : bool = False
+
+#--------------------------------#
+class CallOutcome(BaseModel):
+    room_name : str
+    outcome : str
+
+#--------------------------------#
+class DoNotCall(BaseModel):
+    phone_numbers : List[str]
+    reason : Optional[str] = None
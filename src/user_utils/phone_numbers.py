@@ -0,0 +1,118 @@
+import os
+import numpy as np
+import pandas as pd
+from src.user_utils.utils import to_snake_case
+
+# Contact columns (snake_case, as produced by upload_contact_data) holding the number to dial.
+PHONE_FIELDS = ("phone", "phone_number", "mobile", "mobile_number", "contact_number")
+# Country code assumed for numbers written without one, and the length of a national number there.
+DEFAULT_COUNTRY_CODE = os.getenv("DEFAULT_COUNTRY_CODE", "1").lstrip("+")
+NATIONAL_NUMBER_LENGTH = int(os.getenv("NATIONAL_NUMBER_LENGTH", 10))
+# E.164 allows at most 15 digits; anything under 8 is not a diallable number.
+E164_MIN_DIGITS = 8
+E164_MAX_DIGITS = 15
+# Dropped rows listed in the ingest report.
+REPORT_SAMPLE_SIZE = 20
+
+def find_phone_column(columns):
+    """Return the first column that holds phone numbers, matching raw or snake_case names."""
+    names = {to_snake_case(str(column)): column for column in columns}
+    for field in PHONE_FIELDS:
+        if field in names:
+            return names[field]
+    return None
+
+#-------------------------E164-Normalization-------------------------#
+def phone_text(column: pd.Series) -> pd.Series:
+    """Phone values as stripped strings; numbers read from Excel/CSV often arrive as floats."""
+    if pd.api.types.is_float_dtype(column.dtype):
+        whole = column.notna() & (column == np.floor(column))
+        text = pd.Series("", index=column.index, dtype=object)
+        text[whole] = column[whole].astype("int64").astype(str)
+        return text.astype("string")
+    if pd.api.types.is_integer_dtype(column.dtype):
+        return column.astype(str).astype("string")
+    return column.astype("string").fillna("").str.strip()
+
+def normalize_phone_numbers(column: pd.Series, country_code: str = None,
+                            national_length: int = NATIONAL_NUMBER_LENGTH) -> pd.Series:
+    """Return the column as E.164 strings (+<digits>), NA where the value is not a valid number."""
+    country_code = (country_code or DEFAULT_COUNTRY_CODE).lstrip("+")
+    text = phone_text(column)
+    digits = text.str.replace(r"\D+", "", regex=True)
+    length = digits.str.len()
+    plus = text.str.startswith("+")
+    international = ~plus & digits.str.startswith("00")
+    local = ~plus & ~international
+    number = np.select(
+        [
+            plus,
+            international,
+            local & (length == national_length),
+            # National trunk prefix: 0 followed by the national number
+            local & (length == national_length + 1) & digits.str.startswith("0"),
+            local & (length == len(country_code) + national_length) & digits.str.startswith(country_code),
+        ],
+        [digits, digits.str.slice(2), country_code + digits, country_code + digits.str.slice(1), digits],
+        default="",
+    )
+    number = pd.Series(number, index=column.index, dtype="string")
+    valid = number.str.len().between(E164_MIN_DIGITS, E164_MAX_DIGITS) & ~number.str.startswith("0")
+    return ("+" + number).where(valid.fillna(False).astype(bool))
+
+#-------------------------Contact-Cleaning---------------------------#
+def new_report(phone_column=None):
+    return {
+        "phone_column": phone_column, "total": 0, "kept": 0, "invalid": 0, "duplicates": 0,
+        "invalid_samples": [], "duplicate_samples": [],
+    }
+
+def add_samples(samples: list, raw: pd.Series, mask: pd.Series):
+    room = REPORT_SAMPLE_SIZE - len(samples)
+    if room > 0 and mask.any():
+        for row, value in raw[mask].head(room).items():
+            samples.append({"row": int(row) if isinstance(row, (int, np.integer)) else str(row),
+                            "value": None if pd.isna(value) else str(value)})
+
+def clean_contacts(df: pd.DataFrame, country_code: str = None, seen: set = None, report: dict = None):
+    """Normalize the phone column to E.164 and drop invalid numbers and duplicates.
+
+    Returns (df, report). Pass the same `seen` set and `report` when cleaning a
+    file chunk by chunk so duplicates are caught across chunks.
+    """
+    phone_column = find_phone_column(df.columns)
+    report = report if report is not None else new_report(phone_column)
+    report["total"] += len(df)
+    if phone_column is None:
+        report["kept"] += len(df)
+        return df, report
+    raw = df[phone_column]
+    numbers = normalize_phone_numbers(raw, country_code)
+    invalid = numbers.isna()
+    duplicate = ~invalid & numbers.duplicated(keep="first")
+    if seen:
+        duplicate |= ~invalid & numbers.isin(seen)
+    keep = ~(invalid | duplicate)
+    add_samples(report["invalid_samples"], raw, invalid)
+    add_samples(report["duplicate_samples"], raw, duplicate)
+    report["invalid"] += int(invalid.sum())
+    report["duplicates"] += int(duplicate.sum())
+    report["kept"] += int(keep.sum())
+    df = df[keep].copy()
+    df[phone_column] = numbers[keep].astype(object)
+    if seen is not None:
+        seen.update(df[phone_column])
+    return df, report
+
+def clean_contact_chunks(chunks, country_code: str = None, report: dict = None):
+    """Clean a stream of DataFrame chunks, deduplicating across the whole stream.
+
+    `report` is filled in as chunks are consumed.
+    """
+    seen = set()
+    report = report if report is not None else {}
+    for chunk in chunks:
+        if not report:
+            report.update(new_report(find_phone_column(chunk.columns)))
+        chunk, _ = clean_contacts(chunk, country_code, seen=seen, report=report)
+        yield chunk
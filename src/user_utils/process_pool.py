@@ -0,0 +1,35 @@
+import os
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Worker processes for CPU-bound parsing (Excel sheets, PDF pages).
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", min(4, os.cpu_count() or 1)))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+#--------------------------Parse-Process-Pool------------------------#
+def get_process_pool() -> ProcessPoolExecutor:
+    """Process-wide pool, started on first use and reused across requests.
+
+    Workers come from a fork server where available: forking the Flask process
+    itself would copy its threads and open connections into every worker.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=context)
+        return _pool
+
+def shutdown_process_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+atexit.register(shutdown_process_pool)
@@ -1,11 +1,11 @@
-import fitz
-import docx
-import io
 import string
 import random
+import uuid
 import json
 from livekit import api
 from livekit.protocol.sip import CreateSIPOutboundTrunkRequest, SIPOutboundTrunkInfo
+from src.dialer.livekit_client import livekit_client
+from src.template_engine.compiled_template import compile_template
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -21,45 +21,22 @@ def to_snake_case(col):
 def validate_template(template: str, campaign_columns: list[str]) -> list[str]:
     errors = []
     try:
-        # Check balanced braces
-        open_braces = template.count('{')
-        close_braces = template.count('}')
-        if open_braces != close_braces:
-              errors.append(f"Unmatched braces: {{ count = {open_braces} vs }} count = {close_braces}")
-
-        # Extract placeholders
-        formatter = string.Formatter()
-        placeholders = {field_name for _, field_name, _, _ in formatter.parse(template) if field_name}
+        # Parsed once per distinct template and shared with rendering
+        compiled = compile_template(template)
+        errors.extend(compiled.errors)
 
         # Find placeholders not in columns
-        for ph in placeholders:
-                if ph not in campaign_columns:
-                        errors.append(f"Placeholder {{{ph}}} is not in campaign_columns")
+        for ph in compiled.missing_columns(campaign_columns):
+                errors.append(f"Placeholder {{{ph}}} is not in campaign_columns")
         return errors
     except Exception as e:
         errors.append(f"error in validate_template function: {str(e)}")
+        return errors
 
 #---------------------------------------------------------------------------#
-# Extract text from in-memory .txt
-def extract_text_from_txt(file_stream):
-    return file_stream.read().decode('utf-8')
-
-# Extract text from in-memory .pdf
-def extract_text_from_pdf(file_stream):
-    text = ""
-    with fitz.open(stream=file_stream.read(), filetype="pdf") as doc:
-        for page in doc:
-            text += page.get_text()
-    return text
-
-# Extract text from in-memory .docx
-def extract_text_from_docx(file_stream):
-    doc = docx.Document(io.BytesIO(file_stream.read()))
-    return " ".join([para.text for para in doc.paragraphs])
-
 # Create Livekit Outbound SIP ID
 async def get_lk_outbound_sip(name, address, numbers, user_name, password):
-    livekit_api = api.LiveKitAPI()
+    livekit_api = await livekit_client.get_api()
     trunk = SIPOutboundTrunkInfo(
         name=name,
         address=address,
@@ -70,33 +47,32 @@ async def get_lk_outbound_sip(name, address, numbers, user_name, password):
  
     request = CreateSIPOutboundTrunkRequest(trunk=trunk)
     created_trunk = await livekit_api.sip.create_sip_outbound_trunk(request)
-    await livekit_api.aclose()
     return created_trunk.sip_trunk_id
 
 # Trigger the call
 # Generate a unique room name
-async def trigger_outbound_call(outbound_trunk_id, system_prompt):
-    livekit_api = api.LiveKitAPI()
+async def trigger_outbound_call(outbound_trunk_id, system_prompt, phone_number, livekit_api=None, metadata=None):
+    # Dispatches go through the process-wide pooled client
+    if livekit_api is None:
+        livekit_api = await livekit_client.get_api()
     # Generate a random room name for the outbound call
     # This can be adjusted to fit your naming conventions
-    room_name = f"outbound-{''.join(str(random.randint(0, 9)) for _ in range(10))}"
-    
+    # uuid keeps room names unique across large batches
+    room_name = f"outbound-{uuid.uuid4().hex}"
+
     # Create the dispatch request
     request = api.CreateAgentDispatchRequest(
         agent_name="outbound-caller",
         room=room_name,
         metadata=json.dumps({
-            "phone_number": "+919304263731",
+            **(metadata or {}),
+            "phone_number": phone_number,
             "outbound_trunk_id": outbound_trunk_id,
             "system_prompt": system_prompt
 
         })
     )
-    
+
     # Call the API
     await livekit_api.agent_dispatch.create_dispatch(request)
-    print(f"Dispatch request created for room: {room_name}")
-
-# asyncio.run(trigger_outbound_call())
-     
-     
\ No newline at end of file
+    return room_name
@@ -0,0 +1,49 @@
+import pandas as pd
+from src.template_engine.compiled_template import CompiledTemplate, compile_template, records_frame, template_cache_info
+
+TEMPLATE = 'f"Hi {name}, you owe {amount} on policy {policy}."'
+
+def render_records(records):
+    return list(CompiledTemplate(TEMPLATE).render_frame(records_frame(records)))
+
+def render_each(records):
+    return [CompiledTemplate(TEMPLATE).render(record) for record in records]
+
+def test_integer_field_with_missing_value_renders_like_str_format():
+    records = [
+        {"name": "Asha", "amount": 500, "policy": 1234},
+        {"name": "Ravi", "amount": None, "policy": 5678},
+    ]
+    assert render_records(records) == render_each(records)
+    assert render_records(records)[0] == "Hi Asha, you owe 500 on policy 1234."
+
+def test_mixed_integer_and_float_field_keeps_each_value():
+    records = [
+        {"name": "Asha", "amount": 500, "policy": 1234},
+        {"name": "Ravi", "amount": 12.5, "policy": 5678},
+    ]
+    assert render_records(records) == [
+        "Hi Asha, you owe 500 on policy 1234.",
+        "Hi Ravi, you owe 12.5 on policy 5678.",
+    ]
+
+def test_integer_field_absent_from_a_record_is_not_float():
+    records = [
+        {"name": "Asha", "amount": 500, "policy": 1234},
+        {"name": "Ravi", "policy": 5678},
+    ]
+    df = records_frame(records)
+    assert df["amount"].iloc[0] == 500 and isinstance(df["amount"].iloc[0], int)
+    assert render_records(records)[0] == "Hi Asha, you owe 500 on policy 1234."
+
+def test_float_only_field_stays_numeric():
+    df = records_frame([{"amount": 1.5}, {"amount": None}])
+    assert pd.api.types.is_float_dtype(df["amount"].dtype)
+
+def test_repeated_template_is_compiled_once():
+    template = 'f"Hello {name}, cache check."'
+    before = template_cache_info()
+    assert compile_template(template) is compile_template(template)
+    after = template_cache_info()
+    assert after["misses"] == before["misses"] + 1
+    assert after["hits"] == before["hits"] + 1
@@ -0,0 +1,5 @@
+from src.dialer.lease import DispatchWorker
+
+# Run any number of these processes to dispatch batches launched with "distributed": true
+if __name__ == '__main__':
+    DispatchWorker().run()